@@ -1,5 +1,4 @@
-from django.shortcuts import render
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 
 from decimal import Decimal, InvalidOperation
 from address.models import Place
@@ -51,3 +50,30 @@ def fetch_coordinates(apikey, address):
     except (requests.RequestException, KeyError, ValueError, TypeError):
         Place.objects.create(address=address, lon=None, lat=None)
         return None
+
+
+def get_or_create_coordinates(addresses, apikey):
+    unique_addresses = set(addr.strip() for addr in addresses if addr and addr.strip())
+    if not unique_addresses:
+        return {}
+
+    existing_places = Place.objects.filter(address__in=unique_addresses)
+    coords = {place.address: place.coordinates for place in existing_places}
+
+    missing_addresses = unique_addresses - set(coords.keys())
+
+    new_places = []
+    for addr in missing_addresses:
+        yandex_coords = fetch_coordinates(apikey, addr)
+        if yandex_coords:
+            lat, lon = yandex_coords
+            new_places.append(Place(address=addr, lat=lat, lon=lon))
+            coords[addr] = (lat, lon)
+        else:
+            coords[addr] = None
+
+    if new_places:
+        with transaction.atomic():
+            Place.objects.bulk_create(new_places, ignore_conflicts=True)
+
+    return coords
@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.templatetags.static import static
 from django.utils.html import format_html
 from django.shortcuts import reverse
 from django.http import HttpResponseRedirect
@@ -11,6 +10,11 @@ from .models import Restaurant
 from .models import RestaurantMenuItem
 from .models import Order
 from .models import OrderItem
+from .models import Job
+from .models import Banner
+from .images import get_image_url
+from .search import search_products
+from .tasks import enqueue_on_commit
 
 from star_burger.settings import ALLOWED_HOSTS
 
@@ -51,11 +55,11 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = [
         'category',
     ]
+    # LIKE в SQLite не различает регистр только у латиницы, поэтому ищем по своему индексу
     search_fields = [
-        # FIXME SQLite can not convert letter case for cyrillic words properly, so search will be buggy.
-        # Migration to PostgreSQL is necessary
         'name',
         'category__name',
+        'description',
     ]
 
     inlines = [
@@ -87,23 +91,29 @@ class ProductAdmin(admin.ModelAdmin):
     ]
 
     class Media:
+        # путь без static(): адрес с хэшем из манифеста подставится при отрисовке страницы
         css = {
             "all": (
-                static("admin/foodcartapp.css")
+                "admin/foodcartapp.css",
             )
         }
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search_products(search_term, limit=None)), False
+
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=get_image_url(obj, 'card'))
     get_image_preview.short_description = 'превью'
 
     def get_image_list_preview(self, obj):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
-        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
+        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=get_image_url(obj, 'thumb'))
     get_image_list_preview.short_description = 'превью'
 
 
@@ -138,6 +148,18 @@ class OrderAdmin(admin.ModelAdmin):
         OrderItemInline
     ]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # новый заказ и смену адреса обрабатывает сигнал, здесь — только изменённый состав
+        items_changed = any(formset.has_changed() for formset in formsets)
+        if (
+            change
+            and items_changed
+            and 'address' not in form.changed_data
+            and form.instance.status in Order.OPEN_STATUSES
+        ):
+            enqueue_on_commit('refresh_order_candidates', order_ids=[form.instance.pk])
+
     def response_change(self, request, obj):
         next_url = request.GET.get('next')
         if next_url and url_has_allowed_host_and_scheme(
@@ -148,3 +170,46 @@ class OrderAdmin(admin.ModelAdmin):
             return HttpResponseRedirect(next_url)
 
         return super().response_change(request, obj)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = [
+        'kind',
+        'status',
+        'attempts',
+        'run_after',
+        'finished_at',
+    ]
+    list_filter = [
+        'kind',
+        'status',
+    ]
+
+
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'get_image_list_preview',
+        'title',
+        'position',
+        'is_active',
+        'starts_at',
+        'ends_at',
+    ]
+    list_display_links = [
+        'title',
+    ]
+    list_editable = [
+        'position',
+        'is_active',
+    ]
+    list_filter = [
+        'is_active',
+    ]
+
+    def get_image_list_preview(self, obj):
+        if not obj.image:
+            return 'нет картинки'
+        return format_html('<img src="{src}" style="max-height: 50px;"/>', src=obj.image.url)
+    get_image_list_preview.short_description = 'превью'
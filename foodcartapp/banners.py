@@ -0,0 +1,64 @@
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import fastjson
+from .catalog import bump_version, get_catalog_cache, get_version
+from .compression import compress_variants
+from .models import Banner
+
+
+VERSION_KEY = 'banners:version'
+
+# собранный ответ со списком баннеров в памяти процесса
+local_banners = {}
+
+
+def bump_banners_version():
+    bump_version(VERSION_KEY)
+
+
+def dump_banner(banner):
+    return {
+        'title': banner.title,
+        'src': banner.image.url,
+        'text': banner.text,
+    }
+
+
+def compile_banners(now):
+    body = fastjson.dumps([dump_banner(banner) for banner in Banner.objects.active(now)])
+    next_change = Banner.objects.get_next_change(now)
+    return {
+        'variants': compress_variants(body),
+        'tag': f'banners-{hashlib.md5(body).hexdigest()}',
+        'last_modified': int(now.timestamp()),
+        # ответ устаревает сам, когда какой-то баннер появляется или пропадает по расписанию
+        'expires_at': next_change.timestamp() if next_change else None,
+    }
+
+
+def is_fresh(banners, now):
+    return banners['expires_at'] is None or now.timestamp() < banners['expires_at']
+
+
+def get_banners_response():
+    # база нужна только после изменения баннеров или смены расписания, остальные запросы
+    # обходятся кэшем
+    now = timezone.now()
+    version = get_version(VERSION_KEY)
+    banners = local_banners.get(version)
+    if banners is not None and is_fresh(banners, now):
+        return banners
+
+    cache = get_catalog_cache()
+    cache_key = f'banners:{version}'
+    banners = cache.get(cache_key)
+    if banners is None or not is_fresh(banners, now):
+        banners = compile_banners(now)
+        cache.set(cache_key, banners, timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+    local_banners.clear()
+    local_banners[version] = banners
+    return banners
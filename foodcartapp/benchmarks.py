@@ -0,0 +1,134 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from .banners import local_banners
+from .catalog import local_catalog
+from .eligibility import eligibility_index
+from .models import Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .search import product_index
+
+
+DISHES = ['Бургер', 'Чизбургер', 'Ролл', 'Шаурма', 'Салат', 'Суп', 'Пицца', 'Сэндвич']
+FILLINGS = [
+    'с курицей',
+    'с говядиной',
+    'с лососем',
+    'с грибами',
+    'острый',
+    'вегетарианский',
+    'с ёжиком',
+    'двойной',
+]
+
+
+# кэши в памяти процесса, чтобы синтетические данные не попали в кэши рабочего сайта
+ISOLATED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'isolated-default',
+    },
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'isolated-ratelimit',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'isolated-catalog',
+    },
+}
+
+
+def clear_local_caches():
+    # каталог, баннеры и индексы в памяти процесса соберутся заново при следующем запросе
+    local_catalog.clear()
+    local_banners.clear()
+    product_index.version = None
+    eligibility_index.reset(None)
+
+
+@contextmanager
+def benchmark_database():
+    # замеры идут во временной базе и отдельных кэшах, рабочие остаются нетронутыми
+    setup_test_environment()
+    if connection.vendor == 'sqlite':
+        # файловая база ближе к боевой, чем SQLite в памяти
+        test_dir = tempfile.mkdtemp()
+        connection.settings_dict['TEST']['NAME'] = os.path.join(test_dir, 'benchmark.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with override_settings(CACHES=ISOLATED_CACHES):
+            clear_local_caches()
+            try:
+                yield
+            finally:
+                clear_local_caches()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_catalog(products_count, restaurants_count, categories_count=10, availability=0.8):
+    categories = ProductCategory.objects.bulk_create([
+        ProductCategory(name=f'Категория {number}')
+        for number in range(categories_count)
+    ])
+    restaurants = Restaurant.objects.bulk_create([
+        Restaurant(name=f'Ресторан {number}', address=f'Москва, улица {number}')
+        for number in range(restaurants_count)
+    ])
+    products = Product.objects.bulk_create([
+        Product(
+            name=f'{random.choice(DISHES)} {random.choice(FILLINGS)} {number}',
+            category=random.choice(categories),
+            price=Decimal(random.randint(100, 900)),
+            image=f'products/{number}.jpg',
+            description='Синтетический товар для нагрузочного теста',
+            special_status=number % 10 == 0,
+        )
+        for number in range(products_count)
+    ])
+    for restaurant in restaurants:
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(
+                restaurant=restaurant,
+                product=product,
+                availability=random.random() < availability,
+            )
+            for product in products
+        ])
+    return restaurants, products
+
+
+def run_concurrently(func, concurrency, total_requests):
+    def timed_call(_):
+        started_at = time.perf_counter()
+        result = func()
+        return time.perf_counter() - started_at, result
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        calls = list(executor.map(timed_call, range(total_requests)))
+    elapsed = time.perf_counter() - started_at
+
+    latencies = [latency for latency, _ in calls]
+    results = [result for _, result in calls]
+    return latencies, results, elapsed
+
+
+def summarize_latencies(latencies, elapsed):
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': percentiles[49] * 1000,
+        'p95': percentiles[94] * 1000,
+        'p99': percentiles[98] * 1000,
+    }
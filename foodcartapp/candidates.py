@@ -0,0 +1,84 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from address.views import get_or_create_coordinates
+
+from .distances import get_distance_matrix
+from .models import Order, OrderCandidate, Restaurant
+from .order_feed import bump_orders_version
+
+
+def get_orders_with_products(product_ids):
+    # изменение меню меняет подходящие рестораны только у заказов с этими товарами
+    orders = Order.objects.open()
+    if product_ids is not None:
+        orders = orders.filter(order_items__product__in=product_ids)
+    return set(orders.values_list('pk', flat=True))
+
+
+def get_orders_with_restaurants(restaurant_ids):
+    return set(
+        Order.objects
+        .open()
+        .filter(candidates__restaurant__in=restaurant_ids)
+        .values_list('pk', flat=True)
+    )
+
+
+def refresh_order_candidates(order_ids):
+    orders = list(
+        Order.objects
+        .filter(pk__in=order_ids)
+        .annotate_available_restaurants()
+    )
+    if not orders:
+        return
+
+    restaurant_ids = set()
+    for order in orders:
+        restaurant_ids.update(order.available_restaurant_ids)
+    restaurants = Restaurant.objects.in_bulk(restaurant_ids)
+
+    addresses = {order.address for order in orders}
+    addresses.update(restaurant.address for restaurant in restaurants.values())
+    # геокодер ходит в сеть, поэтому транзакцию открываем только после него
+    coords_map = get_or_create_coordinates(addresses, settings.YANDEX_API_KEY)
+
+    # координаты каждого адреса берутся один раз, а все расстояния считаются одной матрицей
+    order_points = list({
+        coords_map[order.address.strip()]
+        for order in orders
+        if coords_map.get(order.address.strip())
+    })
+    restaurant_points = list({
+        coords_map[restaurant.address.strip()]
+        for restaurant in restaurants.values()
+        if coords_map.get(restaurant.address.strip())
+    })
+    matrix = get_distance_matrix(order_points, restaurant_points)
+    order_rows = {point: row for row, point in enumerate(order_points)}
+    restaurant_columns = {point: column for column, point in enumerate(restaurant_points)}
+
+    candidates = []
+    for order in orders:
+        row = order_rows.get(coords_map.get(order.address.strip()))
+        for restaurant_id in order.available_restaurant_ids:
+            column = restaurant_columns.get(coords_map.get(restaurants[restaurant_id].address.strip()))
+            distance_km = None
+            if row is not None and column is not None:
+                distance_km = matrix[row][column]
+            candidates.append(OrderCandidate(
+                order=order,
+                restaurant_id=restaurant_id,
+                distance_km=distance_km,
+            ))
+
+    with transaction.atomic():
+        OrderCandidate.objects.filter(order__in=orders).delete()
+        OrderCandidate.objects.bulk_create(candidates)
+        refreshed_orders = Order.objects.filter(pk__in=[order.pk for order in orders])
+        now = timezone.now()
+        refreshed_orders.update(candidates_updated_at=now, changed_at=now)
+        refreshed_orders.refresh_nearest_distance()
+        transaction.on_commit(bump_orders_version)
@@ -0,0 +1,247 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import fastjson
+from .compression import compress_variants
+from .images import dump_image_derivatives
+from .models import MAX_ID, Product
+
+
+VERSION_KEY = 'catalog:version'
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+PRODUCT_FIELDS = [
+    'id',
+    'name',
+    'price',
+    'special_status',
+    'description',
+    'category',
+    'image',
+    'images',
+    'restaurant',
+]
+
+# последняя собранная версия каталога в памяти процесса: {версия: {кодировка: тело ответа}}
+local_catalog = {}
+
+
+def get_catalog_cache():
+    return caches[settings.CATALOG_CACHE]
+
+
+def make_catalog_version(previous_version=None):
+    # версия — время изменения в микросекундах, она пригодится и для Last-Modified
+    version = time.time_ns() // 1000
+    if previous_version is not None and version <= previous_version:
+        version = previous_version + 1
+    return version
+
+
+def get_version(key):
+    cache = get_catalog_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, make_catalog_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key):
+    cache = get_catalog_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, make_catalog_version(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def get_catalog_version():
+    return get_version(VERSION_KEY)
+
+
+async def aget_catalog_version():
+    return await aget_version(VERSION_KEY)
+
+
+def bump_version(key):
+    cache = get_catalog_cache()
+    previous_version = cache.get(key)
+    version = make_catalog_version(previous_version)
+    cache.set(key, version, timeout=None)
+    return previous_version, version
+
+
+def bump_catalog_version():
+    return bump_version(VERSION_KEY)
+
+
+def dump_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': product.price,
+        'special_status': product.special_status,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        } if product.category else None,
+        'image': product.image.url,
+        'images': dump_image_derivatives(product),
+        'restaurant': {
+            'id': product.id,
+            'name': product.name,
+        }
+    }
+
+
+def get_available_products():
+    return Product.objects.select_related('category').available()
+
+
+def encode_catalog(dumped_products):
+    return compress_variants(fastjson.dumps(dumped_products))
+
+
+def get_catalog_validators(version, page_query=None):
+    # ETag меняется вместе с версией каталога, Last-Modified — время этого изменения в секундах
+    tag = f'catalog-{version}'
+    if page_query is not None:
+        tag = f'{tag}-{get_page_query_digest(page_query)}'
+    return tag, version // 1_000_000
+
+
+def parse_int(value, name, minimum=1):
+    if not value.isdecimal() or int(value) < minimum:
+        raise ValueError(f'Параметр {name} должен быть целым числом не меньше {minimum}.')
+    if int(value) > MAX_ID:
+        raise ValueError(f'Параметр {name} слишком большой.')
+    return int(value)
+
+
+def parse_page_query(params):
+    # без параметров отдаётся весь каталог одним списком, как раньше
+    page_params = {'cursor', 'limit', 'category', 'special', 'fields'}
+    if not page_params & params.keys():
+        return None
+
+    page_query = {
+        'cursor': 0,
+        'limit': PAGE_SIZE,
+        'category': None,
+        'special': None,
+        'fields': sorted(PRODUCT_FIELDS),
+    }
+    if params.get('cursor'):
+        page_query['cursor'] = parse_int(params['cursor'], 'cursor', minimum=0)
+    if params.get('limit'):
+        page_query['limit'] = min(parse_int(params['limit'], 'limit'), MAX_PAGE_SIZE)
+    if params.get('category'):
+        page_query['category'] = parse_int(params['category'], 'category')
+    if params.get('special'):
+        if params['special'] not in ('0', '1'):
+            raise ValueError('Параметр special принимает значения 0 или 1.')
+        page_query['special'] = params['special'] == '1'
+    if params.get('fields'):
+        fields = [field for field in params['fields'].split(',') if field]
+        unknown_fields = [field for field in fields if field not in PRODUCT_FIELDS]
+        if unknown_fields:
+            raise ValueError(f'Неизвестные поля: {", ".join(unknown_fields)}.')
+        page_query['fields'] = sorted(set(fields))
+    return page_query
+
+
+def get_page_query_digest(page_query):
+    return hashlib.md5(repr(sorted(page_query.items())).encode()).hexdigest()
+
+
+def get_catalog_page_products(page_query):
+    # keyset-пагинация: следующая страница начинается после id последнего товара,
+    # поэтому база идёт по индексу, а не пропускает строки через OFFSET
+    products = (
+        Product.objects
+        .select_related('category')
+        .available()
+        .filter(pk__gt=page_query['cursor'])
+    )
+    if page_query['category'] is not None:
+        products = products.filter(category=page_query['category'])
+    if page_query['special'] is not None:
+        products = products.filter(special_status=page_query['special'])
+    # на одну запись больше, чтобы узнать, есть ли следующая страница
+    return products.order_by('pk')[:page_query['limit'] + 1]
+
+
+def encode_catalog_page(products, page_query):
+    limit = page_query['limit']
+    results = [
+        {
+            field: value
+            for field, value in dump_product(product).items()
+            if field in page_query['fields']
+        }
+        for product in products[:limit]
+    ]
+    next_cursor = products[limit - 1].id if len(products) > limit else None
+    return encode_catalog({'results': results, 'next_cursor': next_cursor})
+
+
+def get_product_catalog(version):
+    variants = local_catalog.get(version)
+    if variants is not None:
+        return variants
+
+    cache = get_catalog_cache()
+    cache_key = f'catalog:products:{version}'
+    variants = cache.get(cache_key)
+    if variants is None:
+        variants = encode_catalog([dump_product(product) for product in get_available_products()])
+        cache.set(cache_key, variants, timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+    local_catalog.clear()
+    local_catalog[version] = variants
+    return variants
+
+
+async def aget_product_catalog(version):
+    variants = local_catalog.get(version)
+    if variants is not None:
+        return variants
+
+    cache = get_catalog_cache()
+    cache_key = f'catalog:products:{version}'
+    variants = await cache.aget(cache_key)
+    if variants is None:
+        variants = encode_catalog([dump_product(product) async for product in get_available_products()])
+        await cache.aset(cache_key, variants, timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+    local_catalog.clear()
+    local_catalog[version] = variants
+    return variants
+
+
+def get_catalog_page(version, page_query):
+    cache = get_catalog_cache()
+    cache_key = f'catalog:page:{version}:{get_page_query_digest(page_query)}'
+    variants = cache.get(cache_key)
+    if variants is None:
+        variants = encode_catalog_page(list(get_catalog_page_products(page_query)), page_query)
+        cache.set(cache_key, variants, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return variants
+
+
+async def aget_catalog_page(version, page_query):
+    cache = get_catalog_cache()
+    cache_key = f'catalog:page:{version}:{get_page_query_digest(page_query)}'
+    variants = await cache.aget(cache_key)
+    if variants is None:
+        products = [product async for product in get_catalog_page_products(page_query)]
+        variants = encode_catalog_page(products, page_query)
+        await cache.aset(cache_key, variants, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return variants
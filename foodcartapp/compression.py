@@ -0,0 +1,46 @@
+import gzip
+
+import brotli
+
+
+# в порядке предпочтения: brotli сжимает JSON заметно лучше gzip
+ENCODINGS = ['br', 'gzip', 'identity']
+
+# каталог из 5 тыс. товаров сжимается за ~10 мс почти так же плотно, как на максимальном
+# уровне 11, который занимает секунды — а пересборка может случиться прямо в запросе
+BROTLI_QUALITY = 5
+
+
+def compress_variants(body):
+    return {
+        'br': brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY),
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        'identity': body,
+    }
+
+
+def parse_accept_encoding(header):
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(request):
+    accepted = parse_accept_encoding(request.headers.get('Accept-Encoding', ''))
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding == 'identity' or quality > 0:
+            return encoding
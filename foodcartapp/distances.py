@@ -0,0 +1,62 @@
+import math
+
+from django.conf import settings
+from geopy import distance
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+EARTH_RADIUS_KM = distance.EARTH_RADIUS
+
+
+def haversine_matrix(origins, destinations):
+    # расстояния по дуге большого круга от каждой точки origins до каждой точки destinations;
+    # с NumPy вся матрица считается одной операцией над массивами
+    if numpy is None:
+        return python_haversine_matrix(origins, destinations)
+    origins = numpy.radians(numpy.asarray(origins, dtype=float).reshape(-1, 2))
+    destinations = numpy.radians(numpy.asarray(destinations, dtype=float).reshape(-1, 2))
+    lat1, lon1 = origins[:, 0, numpy.newaxis], origins[:, 1, numpy.newaxis]
+    lat2, lon2 = destinations[numpy.newaxis, :, 0], destinations[numpy.newaxis, :, 1]
+    a = (
+        numpy.sin((lat2 - lat1) / 2) ** 2
+        + numpy.cos(lat1) * numpy.cos(lat2) * numpy.sin((lon2 - lon1) / 2) ** 2
+    )
+    return (2 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(numpy.clip(a, 0, 1)))).tolist()
+
+
+def python_haversine_matrix(origins, destinations):
+    # радианы и косинус широты каждой точки считаются один раз, а не для каждой пары
+    destinations = [
+        (math.radians(lat), math.radians(lon), math.cos(math.radians(lat)))
+        for lat, lon in destinations
+    ]
+    matrix = []
+    for lat, lon in origins:
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        cos_lat1 = math.cos(lat1)
+        matrix.append([
+            2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(
+                math.sin((lat2 - lat1) / 2) ** 2
+                + cos_lat1 * cos_lat2 * math.sin((lon2 - lon1) / 2) ** 2,
+                1,
+            )))
+            for lat2, lon2, cos_lat2 in destinations
+        ])
+    return matrix
+
+
+def geodesic_matrix(origins, destinations):
+    return [
+        [distance.geodesic(origin, destination).km for destination in destinations]
+        for origin in origins
+    ]
+
+
+def get_distance_matrix(origins, destinations):
+    if settings.DISTANCE_MODE == 'geodesic':
+        return geodesic_matrix(origins, destinations)
+    return haversine_matrix(origins, destinations)
@@ -0,0 +1,122 @@
+import threading
+from functools import reduce
+from operator import and_
+
+from .catalog import bump_version, get_version
+from .models import RestaurantMenuItem
+
+
+VERSION_KEY = 'eligibility:version'
+
+
+class EligibilityIndex:
+    # для каждого товара хранится битовая маска ресторанов, где он сейчас есть;
+    # рестораны, способные собрать заказ, — побитовое И масок всех его товаров
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        # номер изменения индекса: маски, прочитанные из базы до изменения, уже не годятся
+        self.generation = 0
+        self.restaurant_bits = {}
+        self.restaurant_ids = []
+        self.product_masks = {}
+        self.byte_restaurants = {}
+
+    def reset(self, version):
+        with self.lock:
+            self.version = version
+            self.generation += 1
+            self.product_masks = {}
+
+    def discard(self, product_ids, version):
+        with self.lock:
+            self.version = version
+            self.generation += 1
+            for product_id in product_ids:
+                self.product_masks.pop(product_id, None)
+
+    def get_restaurant_bit(self, restaurant_id):
+        bit = self.restaurant_bits.get(restaurant_id)
+        if bit is None:
+            bit = self.restaurant_bits[restaurant_id] = len(self.restaurant_ids)
+            self.restaurant_ids.append(restaurant_id)
+        return bit
+
+    def read_masks(self, product_ids):
+        menu_items = list(
+            RestaurantMenuItem.objects
+            .filter(product__in=product_ids, availability=True)
+            .values_list('product_id', 'restaurant_id')
+        )
+        masks = dict.fromkeys(product_ids, 0)
+        with self.lock:
+            for product_id, restaurant_id in menu_items:
+                masks[product_id] |= 1 << self.get_restaurant_bit(restaurant_id)
+        return masks
+
+    def get_product_masks(self, product_ids):
+        # маски товаров достраиваются по требованию, одним запросом на все недостающие
+        with self.lock:
+            generation = self.generation
+            masks = {
+                product_id: self.product_masks[product_id]
+                for product_id in product_ids
+                if product_id in self.product_masks
+            }
+        missing_product_ids = product_ids - masks.keys()
+        if missing_product_ids:
+            missing_masks = self.read_masks(missing_product_ids)
+            masks.update(missing_masks)
+            with self.lock:
+                # если меню изменилось, пока маски читались из базы, в индекс их не кладём
+                if generation == self.generation:
+                    self.product_masks.update(missing_masks)
+        return masks
+
+    def get_byte_restaurants(self, position, byte):
+        # номера битов не меняются, поэтому множество ресторанов для байта маски считается один раз
+        restaurant_ids = self.byte_restaurants.get((position, byte))
+        if restaurant_ids is None:
+            restaurant_ids = frozenset(
+                self.restaurant_ids[position * 8 + bit]
+                for bit in range(8)
+                if byte >> bit & 1
+            )
+            self.byte_restaurants[(position, byte)] = restaurant_ids
+        return restaurant_ids
+
+    def decode(self, mask):
+        mask_bytes = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+        return set().union(*[
+            self.get_byte_restaurants(position, byte)
+            for position, byte in enumerate(mask_bytes)
+            if byte
+        ])
+
+    def find_restaurants(self, orders_product_ids):
+        # принимает {id заказа: id товаров}, возвращает {id заказа: id подходящих ресторанов}
+        masks = self.get_product_masks(set().union(*orders_product_ids.values()))
+        return {
+            order_id: self.decode(reduce(and_, [masks[product_id] for product_id in product_ids]))
+            if product_ids else set()
+            for order_id, product_ids in orders_product_ids.items()
+        }
+
+
+eligibility_index = EligibilityIndex()
+
+
+def get_eligibility_index():
+    # индекс живёт в памяти процесса, а изменения меню из других процессов видны по версии в кэше
+    version = get_version(VERSION_KEY)
+    if eligibility_index.version != version:
+        eligibility_index.reset(version)
+    return eligibility_index
+
+
+def update_eligibility_index(product_ids):
+    previous_version, version = bump_version(VERSION_KEY)
+    if product_ids is None or previous_version is None or eligibility_index.version != previous_version:
+        eligibility_index.reset(version)
+        return
+    eligibility_index.discard(product_ids, version)
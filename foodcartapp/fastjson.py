@@ -0,0 +1,55 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data, encoder_class=DjangoJSONEncoder):
+    # Decimal, даты и прочие типы вне JSON кодируются так же, как в стандартном энкодере Django
+    if orjson is None:
+        return json.dumps(
+            data,
+            cls=encoder_class,
+            ensure_ascii=False,
+            separators=(',', ':'),
+        ).encode()
+    return orjson.dumps(
+        data,
+        default=encoder_class().default,
+        option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+def loads(data):
+    if orjson is None:
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # как и стандартный рендерер DRF, экранируем разделители строк, недопустимые в JavaScript
+        return (
+            dumps(data, encoder_class=self.encoder_class)
+            .replace('\u2028'.encode(), b'\\u2028')
+            .replace('\u2029'.encode(), b'\\u2029')
+        )
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
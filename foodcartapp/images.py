@@ -0,0 +1,137 @@
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import models, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Product
+
+
+logger = logging.getLogger(__name__)
+
+# наибольшая ширина и высота каждой копии картинки
+IMAGE_SIZES = {
+    'thumb': (100, 100),
+    'card': (400, 400),
+    'full': (1200, 1200),
+}
+JPEG_OPTIONS = {'quality': 85, 'optimize': True, 'progressive': True}
+PNG_OPTIONS = {'optimize': True}
+WEBP_OPTIONS = {'quality': 80, 'method': 4}
+
+
+def make_derivative_name(name, size, extension):
+    root, _ = os.path.splitext(name)
+    return f'{root}.{size}.{extension}'
+
+
+def save_image(storage, name, image, image_format, options):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def has_transparency(image):
+    return image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+
+
+def open_image(image_field):
+    with image_field.open('rb'):
+        image = Image.open(image_field)
+        # JPEG сразу декодируется в уменьшенном виде, это в разы быстрее полного размера
+        image.draft('RGB', max(IMAGE_SIZES.values()))
+        image.load()
+    # телефоны пишут поворот кадра в EXIF, а не в сами пиксели
+    return ImageOps.exif_transpose(image)
+
+
+def generate_image_derivatives(image_field):
+    storage = image_field.storage
+    source = open_image(image_field)
+    if has_transparency(source):
+        source = source.convert('RGBA')
+        fallback_format, fallback_extension, fallback_options = 'PNG', 'png', PNG_OPTIONS
+    else:
+        source = source.convert('RGB')
+        fallback_format, fallback_extension, fallback_options = 'JPEG', 'jpg', JPEG_OPTIONS
+
+    derivatives = {'source': image_field.name}
+    for size, max_size in IMAGE_SIZES.items():
+        image = source.copy()
+        image.thumbnail(max_size, Image.LANCZOS)
+        derivatives[size] = {
+            'fallback': save_image(
+                storage,
+                make_derivative_name(image_field.name, size, fallback_extension),
+                image,
+                fallback_format,
+                fallback_options,
+            ),
+            'webp': save_image(
+                storage,
+                make_derivative_name(image_field.name, size, 'webp'),
+                image,
+                'WEBP',
+                WEBP_OPTIONS,
+            ),
+            'width': image.width,
+            'height': image.height,
+        }
+    return derivatives
+
+
+def delete_image_derivatives(storage, derivatives):
+    for size in IMAGE_SIZES:
+        if size in derivatives:
+            storage.delete(derivatives[size]['fallback'])
+            storage.delete(derivatives[size]['webp'])
+
+
+def refresh_image_derivatives(product, force=False):
+    # возвращает, изменились ли копии
+    if not force and product.image_derivatives.get('source') == product.image.name:
+        return False
+
+    derivatives = {}
+    if product.image:
+        try:
+            derivatives = generate_image_derivatives(product.image)
+        except (OSError, UnidentifiedImageError):
+            # без копий API отдаёт оригинал, поэтому битая картинка не мешает сохранить товар
+            logger.warning('Не удалось уменьшить картинку %s', product.image.name, exc_info=True)
+
+    previous_derivatives = product.image_derivatives
+    product.image_derivatives = derivatives
+    # обычный update: сохранение товара уже разослало catalog_changed
+    models.QuerySet.update(Product.objects.filter(pk=product.pk), image_derivatives=derivatives)
+    # старые копии удаляются только после коммита, иначе при откате запись ссылалась бы на удалённые файлы
+    storage = product.image.storage
+    transaction.on_commit(lambda: delete_image_derivatives(storage, previous_derivatives))
+    return True
+
+
+def dump_image_derivatives(product):
+    derivatives = product.image_derivatives
+    if derivatives.get('source') != product.image.name:
+        return None
+
+    storage = product.image.storage
+    return {
+        size: {
+            'url': storage.url(derivatives[size]['fallback']),
+            'webp_url': storage.url(derivatives[size]['webp']),
+            'width': derivatives[size]['width'],
+            'height': derivatives[size]['height'],
+        }
+        for size in IMAGE_SIZES
+        if size in derivatives
+    }
+
+
+def get_image_url(product, size):
+    images = dump_image_derivatives(product)
+    if images and size in images:
+        return images[size]['webp_url']
+    return product.image.url
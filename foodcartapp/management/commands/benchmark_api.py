@@ -0,0 +1,106 @@
+import json
+import random
+import threading
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from foodcartapp.benchmarks import (
+    benchmark_database,
+    run_concurrently,
+    seed_catalog,
+    summarize_latencies,
+)
+
+
+ENDPOINTS = ['products', 'banners', 'order']
+
+
+def fake_fetch_coordinates(apikey, address):
+    rnd = random.Random(address)
+    return 55.5 + rnd.random() / 2, 37.3 + rnd.random() / 2
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет временную базу синтетическим каталогом и замеряет задержки, '
+        'пропускную способность и число SQL-запросов у публичного API'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            choices=ENDPOINTS,
+            help='Какой адрес API замерить, можно указать несколько раз',
+        )
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--restaurants', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with benchmark_database(), mock.patch('address.views.fetch_coordinates', fake_fetch_coordinates):
+            _, products = seed_catalog(options['products'], options['restaurants'])
+            product_ids = [product.pk for product in products]
+            for endpoint in options['endpoints'] or ENDPOINTS:
+                self.benchmark(endpoint, product_ids, options['concurrency'], options['requests'])
+
+    def benchmark(self, endpoint, product_ids, concurrency, total_requests):
+        local = threading.local()
+        thread_connections = []
+        lock = threading.Lock()
+
+        def send_request():
+            if not hasattr(local, 'client'):
+                local.client = Client(raise_request_exception=False)
+                thread_connection = connections['default']
+                thread_connection.inc_thread_sharing()
+                with lock:
+                    thread_connections.append(thread_connection)
+
+            with CaptureQueriesContext(connections['default']) as queries:
+                if endpoint == 'order':
+                    response = local.client.post(
+                        '/api/order/',
+                        json.dumps(self.make_order(product_ids)),
+                        content_type='application/json',
+                        # разные клиенты, чтобы замер не упирался в ограничение частоты заказов
+                        REMOTE_ADDR=f'10.0.{random.randint(0, 255)}.{random.randint(1, 254)}',
+                    )
+                else:
+                    response = local.client.get(f'/api/{endpoint}/')
+            return response.status_code, len(queries)
+
+        try:
+            latencies, results, elapsed = run_concurrently(send_request, concurrency, total_requests)
+        finally:
+            for thread_connection in thread_connections:
+                thread_connection.close()
+                thread_connection.dec_thread_sharing()
+
+        summary = summarize_latencies(latencies, elapsed)
+        errors = sum(status_code >= 400 for status_code, _ in results)
+        queries_per_request = sum(queries for _, queries in results) / len(results)
+        self.stdout.write(
+            f"/api/{endpoint}/: {summary['rps']:.1f} запр/с, "
+            f"p50 {summary['p50']:.1f} мс, p95 {summary['p95']:.1f} мс, "
+            f"p99 {summary['p99']:.1f} мс, SQL-запросов на запрос {queries_per_request:.1f}, "
+            f"ошибок {errors}"
+        )
+
+    def make_order(self, product_ids):
+        return {
+            'products': [
+                {'product': product_id, 'quantity': random.randint(1, 3)}
+                for product_id in random.sample(product_ids, random.randint(1, 5))
+            ],
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': f'+7929{random.randint(0, 9999999):07d}',
+            'address': f'Москва, улица {random.randint(1, 100)}',
+        }
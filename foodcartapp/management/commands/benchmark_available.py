@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.benchmarks import benchmark_database, seed_catalog
+from foodcartapp.models import Product, RestaurantMenuItem
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает выборку доступных товаров через подзапрос к меню ресторанов '
+        'и через денормализованный флаг, а также цену поддержания флага'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=3000)
+        parser.add_argument('--restaurants', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            restaurants, _ = seed_catalog(options['products'], options['restaurants'])
+            repeat = options['repeat']
+
+            def select_by_subquery():
+                list(
+                    Product.objects
+                    .select_related('category')
+                    .filter(pk__in=RestaurantMenuItem.objects.filter(availability=True).values('product'))
+                )
+
+            def select_by_flag():
+                list(Product.objects.select_related('category').available())
+
+            menu_item = RestaurantMenuItem.objects.first()
+
+            def toggle_menu_item():
+                menu_item.availability = not menu_item.availability
+                menu_item.save()
+
+            restaurant_menu = RestaurantMenuItem.objects.filter(restaurant=restaurants[0])
+
+            def toggle_restaurant_menu():
+                restaurant_menu.update(availability=False)
+                restaurant_menu.update(availability=True)
+
+            self.stdout.write(f'Подзапрос к меню: {measure(select_by_subquery, repeat):.1f} мс')
+            self.stdout.write(f'Флаг is_available: {measure(select_by_flag, repeat):.1f} мс')
+            self.stdout.write(f'Сохранение пункта меню: {measure(toggle_menu_item, repeat):.1f} мс')
+            self.stdout.write(
+                f'Закрытие и открытие меню ресторана: {measure(toggle_restaurant_menu, repeat):.1f} мс'
+            )
@@ -0,0 +1,67 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from geopy import distance
+
+from foodcartapp import distances
+
+
+# окрестности Москвы
+LAT_RANGE = (55.55, 55.95)
+LON_RANGE = (37.35, 37.85)
+
+
+def random_points(count):
+    return [(random.uniform(*LAT_RANGE), random.uniform(*LON_RANGE)) for _ in range(count)]
+
+
+def distances_by_pairs(origins, destinations):
+    # прежний способ: отдельный вызов geopy для каждой пары заказ — ресторан
+    return [
+        [distance.distance(origin, destination).km for destination in destinations]
+        for origin in origins
+    ]
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает расчёт расстояний от заказов до ресторанов по парам и матрицей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=300)
+        parser.add_argument('--restaurants', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        origins = random_points(options['orders'])
+        destinations = random_points(options['restaurants'])
+        repeat = options['repeat']
+
+        pairs_timing, exact = measure(lambda: distances_by_pairs(origins, destinations), repeat)
+        self.stdout.write(f'geopy по парам: {pairs_timing:.1f} мс')
+
+        methods = [('Геодезическая матрица', distances.geodesic_matrix)]
+        if distances.numpy is not None:
+            methods.append(('Гаверсинус на NumPy', distances.haversine_matrix))
+        else:
+            self.stdout.write('NumPy не установлен')
+        methods.append(('Гаверсинус на Python', distances.python_haversine_matrix))
+
+        for title, method in methods:
+            timing, matrix = measure(lambda: method(origins, destinations), repeat)
+            max_error = max(
+                abs(value - exact_value) / exact_value
+                for row, exact_row in zip(matrix, exact)
+                for value, exact_value in zip(row, exact_row)
+                if exact_value
+            )
+            self.stdout.write(f'{title}: {timing:.1f} мс, наибольшая погрешность {max_error:.2%}')
@@ -0,0 +1,129 @@
+import random
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.benchmarks import benchmark_database, seed_catalog
+from foodcartapp.eligibility import eligibility_index
+from foodcartapp.models import Order, OrderItem, RestaurantMenuItem
+
+
+def load_order_products(orders):
+    order_to_product_ids = defaultdict(set)
+    for order_id, product_id in orders.values_list('id', 'order_items__product_id'):
+        if product_id is not None:
+            order_to_product_ids[order_id].add(product_id)
+    return order_to_product_ids
+
+
+def load_restaurant_products(product_ids):
+    restaurant_to_products = defaultdict(set)
+    menu_items = (
+        RestaurantMenuItem.objects
+        .filter(product_id__in=product_ids, availability=True)
+        .values_list('restaurant_id', 'product_id')
+    )
+    for restaurant_id, product_id in menu_items:
+        restaurant_to_products[restaurant_id].add(product_id)
+    return restaurant_to_products
+
+
+def match_with_sets(order_to_product_ids, restaurant_to_products):
+    # прежний алгоритм: проверка required.issubset(products) для каждой пары заказ — ресторан
+    return {
+        order_id: {
+            restaurant_id
+            for restaurant_id, products in restaurant_to_products.items()
+            if required.issubset(products)
+        }
+        for order_id, required in order_to_product_ids.items()
+    }
+
+
+def find_restaurants_with_sets(orders):
+    order_to_product_ids = load_order_products(orders)
+    restaurant_to_products = load_restaurant_products(set().union(*order_to_product_ids.values()))
+    available_restaurant_ids = match_with_sets(order_to_product_ids, restaurant_to_products)
+    return {order.id: available_restaurant_ids.get(order.id, set()) for order in orders}
+
+
+def find_restaurants_with_bitmasks(orders):
+    return {order.id: order.available_restaurant_ids for order in orders.annotate_available_restaurants()}
+
+
+def measure(func, repeat, before=None):
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started_at = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает подбор ресторанов для заказов на множествах Python и на битовых масках'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--restaurants', type=int, default=300)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            _, products = seed_catalog(options['products'], options['restaurants'], availability=0.9)
+            self.seed_orders(options['orders'], products)
+
+            repeat = options['repeat']
+            orders = Order.objects.filter(status='pending')
+
+            def reset_index():
+                eligibility_index.reset(None)
+
+            sets_timing, sets_result = measure(lambda: find_restaurants_with_sets(orders), repeat)
+            cold_timing, bitmasks_result = measure(
+                lambda: find_restaurants_with_bitmasks(orders),
+                repeat,
+                before=reset_index,
+            )
+            warm_timing, _ = measure(lambda: find_restaurants_with_bitmasks(orders), repeat)
+            if sets_result != bitmasks_result:
+                self.stderr.write('Результаты алгоритмов расходятся')
+
+            # отдельно сам подбор, без загрузки заказов и меню из базы
+            order_to_product_ids = load_order_products(orders)
+            restaurant_to_products = load_restaurant_products(set().union(*order_to_product_ids.values()))
+            sets_match_timing, _ = measure(
+                lambda: match_with_sets(order_to_product_ids, restaurant_to_products),
+                repeat,
+            )
+            bitmasks_match_timing, _ = measure(
+                lambda: eligibility_index.find_restaurants(order_to_product_ids),
+                repeat,
+            )
+
+            self.stdout.write(f'Множества: {sets_timing:.0f} мс, из них подбор {sets_match_timing:.0f} мс')
+            self.stdout.write(
+                f'Битовые маски: {cold_timing:.0f} мс с пустым индексом, {warm_timing:.0f} мс с заполненным, '
+                f'из них подбор {bitmasks_match_timing:.0f} мс'
+            )
+
+    def seed_orders(self, orders_count, products):
+        orders = Order.objects.bulk_create([
+            Order(
+                firstname='Иван',
+                lastname='Петров',
+                phonenumber='+79291234567',
+                address=f'Москва, улица {number}',
+                payment_type='cash',
+            )
+            for number in range(orders_count)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for order in orders
+            for product in random.sample(products, random.randint(1, 5))
+        ])
@@ -0,0 +1,55 @@
+import json
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from foodcartapp import fastjson
+
+
+def make_catalog(products_count):
+    return [
+        {
+            'id': number,
+            'name': f'Бургер {number}',
+            'price': Decimal(100 + number % 900) + Decimal('0.50'),
+            'special_status': number % 10 == 0,
+            'description': 'Синтетический товар для замера скорости кодирования JSON',
+            'category': {
+                'id': number % 10,
+                'name': f'Категория {number % 10}',
+            },
+            'image': f'/media/products/{number}.jpg',
+            'restaurant': {
+                'id': number,
+                'name': f'Бургер {number}',
+            }
+        }
+        for number in range(products_count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость кодирования каталога в JSON стандартным и быстрым энкодером'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        catalog = make_catalog(options['products'])
+        encoders = {
+            'json + DjangoJSONEncoder, indent=4': lambda: json.dumps(
+                catalog, cls=DjangoJSONEncoder, ensure_ascii=False, indent=4
+            ).encode(),
+            'json + DjangoJSONEncoder, компактный': lambda: json.dumps(
+                catalog, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')
+            ).encode(),
+            f"fastjson ({'orjson' if fastjson.orjson else 'json'})": lambda: fastjson.dumps(catalog),
+        }
+
+        self.stdout.write(f"Каталог из {options['products']} товаров:")
+        for name, encode in encoders.items():
+            best = min(timeit.repeat(encode, number=1, repeat=options['repeat']))
+            self.stdout.write(f'  {name}: {best * 1000:.1f} мс, {len(encode())} байт')
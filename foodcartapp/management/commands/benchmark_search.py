@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.benchmarks import benchmark_database, seed_catalog
+from foodcartapp.catalog import get_catalog_version
+from foodcartapp.search import product_index
+
+
+QUERIES = ['бургер', 'БУРГ', 'ролл с лос', 'ежик', 'шаурма острая', 'с', 'ку', 'нет такого']
+
+
+class Command(BaseCommand):
+    help = 'Замеряет сборку поискового индекса товаров и время ответа на типичные запросы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed_catalog(options['products'], restaurants_count=5)
+
+            started_at = time.perf_counter()
+            product_index.rebuild(get_catalog_version())
+            self.stdout.write(f'Сборка индекса: {(time.perf_counter() - started_at) * 1000:.0f} мс')
+
+            for query in QUERIES:
+                started_at = time.perf_counter()
+                for _ in range(options['repeat']):
+                    results = product_index.search(query, available_only=True)
+                elapsed = (time.perf_counter() - started_at) / options['repeat']
+                self.stdout.write(f'«{query}»: {elapsed * 1_000_000:.0f} мкс, найдено {len(results)}')
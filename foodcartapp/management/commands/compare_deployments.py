@@ -0,0 +1,58 @@
+import requests
+from django.core.management.base import BaseCommand
+
+from foodcartapp.benchmarks import run_concurrently, summarize_latencies
+
+
+def measure(url, concurrency, total_requests):
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        latencies, responses_ok, elapsed = run_concurrently(
+            lambda: session.get(url).ok,
+            concurrency,
+            total_requests,
+        )
+
+    summary = summarize_latencies(latencies, elapsed)
+    summary['errors'] = responses_ok.count(False)
+    return summary
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает число запросов в секунду у WSGI- и ASGI-деплоя сайта'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--asgi-url', default='http://127.0.0.1:8001')
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Адрес API для замера, можно указать несколько раз',
+        )
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/products/', '/api/banners/']
+        deployments = {
+            'WSGI': options['wsgi_url'].rstrip('/'),
+            'ASGI': options['asgi_url'].rstrip('/'),
+        }
+
+        for path in paths:
+            self.stdout.write(path)
+            for deployment, base_url in deployments.items():
+                result = measure(
+                    base_url + path,
+                    options['concurrency'],
+                    options['requests'],
+                )
+                self.stdout.write(
+                    f"  {deployment}: {result['rps']:.1f} запр/с, "
+                    f"p50 {result['p50']:.1f} мс, p95 {result['p95']:.1f} мс, "
+                    f"ошибок {result['errors']}"
+                )
@@ -0,0 +1,24 @@
+import os
+
+from django.contrib.staticfiles import finders
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Banner
+
+
+class Command(BaseCommand):
+    help = 'Копирует картинки баннеров из статики в медиафайлы, если их там ещё нет'
+
+    def handle(self, *args, **options):
+        for banner in Banner.objects.exclude(image=''):
+            if default_storage.exists(banner.image.name):
+                continue
+            path = finders.find(os.path.basename(banner.image.name))
+            if not path:
+                self.stderr.write(f'{banner.image.name}: нет ни в медиафайлах, ни в статике')
+                continue
+            with open(path, 'rb') as file:
+                default_storage.save(banner.image.name, File(file))
+            self.stdout.write(f'{banner.image.name}: скопирован')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.images import refresh_image_derivatives
+from foodcartapp.models import Product
+from foodcartapp.signals import catalog_changed
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии и WebP для картинок товаров, у которых их ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии для всех картинок',
+        )
+
+    def handle(self, *args, **options):
+        changed_product_ids = set()
+        for product in Product.objects.exclude(image='').iterator():
+            if refresh_image_derivatives(product, force=options['force']):
+                changed_product_ids.add(product.pk)
+            if product.image_derivatives:
+                self.stdout.write(f'{product.image.name}: готово')
+            else:
+                self.stderr.write(f'{product.image.name}: не удалось прочитать картинку')
+        if changed_product_ids:
+            # ссылки на копии картинок входят в ответ каталога
+            catalog_changed.send(sender=Product, product_ids=changed_product_ids)
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import IdempotencyKey, Order
+from foodcartapp.tasks import (
+    delete_finished_jobs,
+    enqueue,
+    requeue_stale_jobs,
+    run_pending_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить накопившиеся задачи и завершиться',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+
+    def handle(self, *args, **options):
+        self.enqueue_missing_candidates()
+
+        while True:
+            requeue_stale_jobs()
+            processed = run_pending_jobs()
+            if processed:
+                self.stdout.write(f'Выполнено задач: {processed}')
+
+            if options['once']:
+                break
+            if not processed:
+                delete_finished_jobs()
+                IdempotencyKey.objects.expired().delete()
+                time.sleep(options['sleep'])
+
+    def enqueue_missing_candidates(self):
+        # заказы, задачи для которых потерялись, например, при падении процесса
+        order_ids = list(
+            Order.objects
+            .filter(status='pending', candidates_updated_at__isnull=True)
+            .values_list('pk', flat=True)
+        )
+        if order_ids:
+            enqueue('refresh_order_candidates', order_ids=order_ids)
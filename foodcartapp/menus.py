@@ -0,0 +1,133 @@
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .catalog import (
+    aget_version,
+    dump_product,
+    encode_catalog,
+    get_catalog_cache,
+    get_version,
+    make_catalog_version,
+)
+from .models import MAX_ID, Restaurant, RestaurantMenuItem
+
+
+def get_menu_version_key(restaurant_id):
+    return f'menu:version:{restaurant_id}'
+
+
+def get_menu_key(restaurant_id, version):
+    return f'menu:{restaurant_id}:{version}'
+
+
+def get_restaurants_with_id(restaurant_id):
+    if not 0 < restaurant_id <= MAX_ID:
+        return Restaurant.objects.none()
+    return Restaurant.objects.filter(pk=restaurant_id)
+
+
+def get_menu_version(restaurant_id):
+    # None — ресторана нет; версия без срока хранения заводится только для существующих
+    # ресторанов, иначе перебор id засорил бы кэш и вытеснил версии каталога
+    version_key = get_menu_version_key(restaurant_id)
+    if get_catalog_cache().get(version_key) is None:
+        if not get_restaurants_with_id(restaurant_id).exists():
+            return None
+    return get_version(version_key)
+
+
+async def aget_menu_version(restaurant_id):
+    version_key = get_menu_version_key(restaurant_id)
+    if await get_catalog_cache().aget(version_key) is None:
+        if not await get_restaurants_with_id(restaurant_id).aexists():
+            return None
+    return await aget_version(version_key)
+
+
+def get_menu_validators(restaurant_id, version):
+    return f'menu-{restaurant_id}-{version}', version // 1_000_000
+
+
+def bump_menu_versions(restaurant_ids):
+    cache = get_catalog_cache()
+    version_keys = [get_menu_version_key(restaurant_id) for restaurant_id in restaurant_ids]
+    versions = cache.get_many(version_keys)
+    cache.set_many(
+        {key: make_catalog_version(versions.get(key)) for key in version_keys},
+        timeout=None,
+    )
+
+
+def get_affected_restaurant_ids(product_ids=None, restaurant_ids=None):
+    if restaurant_ids is not None:
+        return sorted(restaurant_ids)
+    restaurants = Restaurant.objects.all()
+    if product_ids is not None:
+        restaurants = restaurants.filter(menu_items__product__in=product_ids).distinct()
+    return list(restaurants.order_by('pk').values_list('pk', flat=True))
+
+
+def build_menu_snapshots(restaurant_ids):
+    restaurants = Restaurant.objects.in_bulk(restaurant_ids)
+    menu_items = (
+        RestaurantMenuItem.objects
+        .filter(restaurant__in=restaurants, availability=True)
+        .select_related('product__category')
+        .order_by('product')
+    )
+    restaurant_products = defaultdict(list)
+    for menu_item in menu_items:
+        dumped_product = dump_product(menu_item.product)
+        del dumped_product['restaurant']
+        restaurant_products[menu_item.restaurant_id].append(dumped_product)
+
+    return {
+        restaurant.id: encode_catalog({
+            'restaurant': {
+                'id': restaurant.id,
+                'name': restaurant.name,
+                'address': restaurant.address,
+            },
+            'products': restaurant_products[restaurant.id],
+        })
+        for restaurant in restaurants.values()
+    }
+
+
+def get_restaurant_menu(restaurant_id, version):
+    # None — ресторана нет
+    cache = get_catalog_cache()
+    cache_key = get_menu_key(restaurant_id, version)
+    variants = cache.get(cache_key)
+    if variants is None:
+        variants = build_menu_snapshots([restaurant_id]).get(restaurant_id)
+        if variants is not None:
+            cache.set(cache_key, variants, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return variants
+
+
+async def aget_restaurant_menu(restaurant_id, version):
+    cache = get_catalog_cache()
+    cache_key = get_menu_key(restaurant_id, version)
+    variants = await cache.aget(cache_key)
+    if variants is None:
+        snapshots = await sync_to_async(build_menu_snapshots)([restaurant_id])
+        variants = snapshots.get(restaurant_id)
+        if variants is not None:
+            await cache.aset(cache_key, variants, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return variants
+
+
+def rebuild_menu_snapshots(restaurant_ids):
+    # версии читаются до сборки: если меню успеет измениться, снимок ляжет под устаревший ключ
+    versions = {restaurant_id: get_menu_version(restaurant_id) for restaurant_id in restaurant_ids}
+    snapshots = build_menu_snapshots(restaurant_ids)
+    get_catalog_cache().set_many(
+        {
+            get_menu_key(restaurant_id, versions[restaurant_id]): variants
+            for restaurant_id, variants in snapshots.items()
+        },
+        timeout=settings.CATALOG_CACHE_TIMEOUT,
+    )
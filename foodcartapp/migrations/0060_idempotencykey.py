@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("foodcartapp", "0059_alter_orderitem_price"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(max_length=255, unique=True, verbose_name="ключ"),
+                ),
+                (
+                    "response_status",
+                    models.PositiveSmallIntegerField(verbose_name="код ответа"),
+                ),
+                ("response_data", models.JSONField(verbose_name="тело ответа")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="дата создания"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="действует до"),
+                ),
+            ],
+            options={
+                "verbose_name": "ключ идемпотентности",
+                "verbose_name_plural": "ключи идемпотентности",
+            },
+        ),
+    ]
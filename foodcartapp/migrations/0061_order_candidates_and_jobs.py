@@ -0,0 +1,145 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("foodcartapp", "0060_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="candidates_updated_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="дата подбора ресторанов"
+            ),
+        ),
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=50, verbose_name="тип задачи")),
+                (
+                    "payload",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="параметры"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "в очереди"),
+                            ("running", "выполняется"),
+                            ("done", "выполнена"),
+                            ("failed", "ошибка"),
+                        ],
+                        default="queued",
+                        max_length=10,
+                        verbose_name="статус",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="число попыток"
+                    ),
+                ),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="запустить после",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="дата создания"
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="дата запуска"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="дата завершения"
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(blank=True, verbose_name="последняя ошибка"),
+                ),
+            ],
+            options={
+                "verbose_name": "фоновая задача",
+                "verbose_name_plural": "фоновые задачи",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"],
+                        name="foodcartapp_status_2a0a4a_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="OrderCandidate",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "distance_km",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="расстояние, км"
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="candidates",
+                        to="foodcartapp.order",
+                        verbose_name="заказ",
+                    ),
+                ),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="order_candidates",
+                        to="foodcartapp.restaurant",
+                        verbose_name="ресторан",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "ресторан для заказа",
+                "verbose_name_plural": "рестораны для заказов",
+                "unique_together": {("order", "restaurant")},
+            },
+        ),
+    ]
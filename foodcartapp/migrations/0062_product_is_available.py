@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:05
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+class Migration(migrations.Migration):
+
+    def fill_is_available_field(apps, schema_editor):
+        Product = apps.get_model('foodcartapp', 'Product')
+        RestaurantMenuItem = apps.get_model('foodcartapp', 'RestaurantMenuItem')
+        available_menu_items = RestaurantMenuItem.objects.filter(
+            product=OuterRef('pk'),
+            availability=True,
+        )
+        Product.objects.update(is_available=Exists(available_menu_items))
+
+    dependencies = [
+        ("foodcartapp", "0061_order_candidates_and_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="is_available",
+            field=models.BooleanField(
+                db_index=True,
+                default=False,
+                editable=False,
+                verbose_name="есть в ресторанах",
+            ),
+        ),
+        migrations.RunPython(fill_is_available_field, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("foodcartapp", "0062_product_is_available"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["is_available", "id"], name="foodcartapp_is_avai_bb187a_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "is_available", "id"],
+                name="foodcartapp_categor_ef0b14_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["special_status", "is_available", "id"],
+                name="foodcartapp_special_e0bf87_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("foodcartapp", "0063_product_catalog_page_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_derivatives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="уменьшенные копии картинки",
+            ),
+        ),
+    ]
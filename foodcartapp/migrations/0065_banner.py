@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    def move_banners_to_db(apps, schema_editor):
+        # миграция только заводит записи, а картинки в media/banners/ копирует
+        # команда copy_banner_images: миграции не должны писать файлы
+        Banner = apps.get_model('foodcartapp', 'Banner')
+        banners = [
+            ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+            ('Spices', 'food.jpg', 'All Cuisines'),
+            ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+        ]
+        for position, (title, filename, text) in enumerate(banners):
+            Banner.objects.create(title=title, text=text, image=f'banners/{filename}', position=position)
+
+    dependencies = [
+        ("foodcartapp", "0064_product_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Banner",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.CharField(max_length=50, verbose_name="заголовок")),
+                (
+                    "text",
+                    models.CharField(blank=True, max_length=200, verbose_name="текст"),
+                ),
+                (
+                    "image",
+                    models.ImageField(upload_to="banners", verbose_name="картинка"),
+                ),
+                (
+                    "position",
+                    models.PositiveIntegerField(
+                        db_index=True, default=0, verbose_name="порядок"
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(default=True, verbose_name="показывать"),
+                ),
+                (
+                    "starts_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="показывать с"
+                    ),
+                ),
+                (
+                    "ends_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="показывать до"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "баннер",
+                "verbose_name_plural": "баннеры",
+                "ordering": ["position", "id"],
+            },
+        ),
+        migrations.RunPython(move_banners_to_db, migrations.RunPython.noop),
+    ]
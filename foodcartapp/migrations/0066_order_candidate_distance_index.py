@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("foodcartapp", "0065_banner"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ordercandidate",
+            index=models.Index(
+                fields=["order", "distance_km"], name="foodcartapp_order_i_73f8b8_idx"
+            ),
+        ),
+    ]
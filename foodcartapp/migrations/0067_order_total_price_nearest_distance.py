@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:32
+
+from django.db import migrations, models
+from django.db.models import F, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+class Migration(migrations.Migration):
+
+    def fill_order_totals(apps, schema_editor):
+        Order = apps.get_model('foodcartapp', 'Order')
+        OrderItem = apps.get_model('foodcartapp', 'OrderItem')
+        OrderCandidate = apps.get_model('foodcartapp', 'OrderCandidate')
+        total_prices = (
+            OrderItem.objects
+            .filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total=Sum(F('price') * F('quantity')))
+            .values('total')
+        )
+        nearest_distances = (
+            OrderCandidate.objects
+            .filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(nearest=Min('distance_km'))
+            .values('nearest')
+        )
+        Order.objects.update(
+            total_price=Coalesce(Subquery(total_prices), Value(0), output_field=models.DecimalField()),
+            nearest_distance_km=Subquery(nearest_distances),
+        )
+
+    dependencies = [
+        ("foodcartapp", "0066_order_candidate_distance_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="nearest_distance_km",
+            field=models.FloatField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="расстояние до ближайшего ресторана, км",
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total_price",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                max_digits=10,
+                verbose_name="стоимость заказа",
+            ),
+        ),
+        migrations.RunPython(fill_order_totals, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "registration_date", "id"],
+                name="foodcartapp_status_c73ab7_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "total_price", "id"],
+                name="foodcartapp_status_7dbbb4_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["status", "nearest_distance_km", "id"],
+                name="foodcartapp_status_560e4b_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("foodcartapp", "0067_order_total_price_nearest_distance"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="changed_at",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="дата изменения",
+            ),
+        ),
+    ]
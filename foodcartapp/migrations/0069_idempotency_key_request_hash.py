@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("foodcartapp", "0068_order_changed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="request_hash",
+            field=models.CharField(
+                default="", max_length=64, verbose_name="хэш тела запроса"
+            ),
+        ),
+    ]
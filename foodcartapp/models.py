@@ -1,11 +1,17 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from collections import defaultdict
 
 from phonenumber_field.modelfields import PhoneNumberField
-from django.db.models import Sum, F
+from django.db.models import Sum, F, Exists, OuterRef, Q, Min, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .signals import catalog_changed
+
+
+# id больше 64-битного целого в базе быть не может, а SQLite на таком числе в запросе падает
+MAX_ID = 2 ** 63 - 1
 
 
 class Restaurant(models.Model):
@@ -31,15 +37,73 @@ class Restaurant(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # расстояния до заказов пересчитываются, только если изменился адрес
+        instance.loaded_address = instance.__dict__.get('address')
+        return instance
+
+    def is_address_changed(self):
+        return getattr(self, 'loaded_address', None) != self.address
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.loaded_address = self.address
+
+
+class CatalogQuerySet(models.QuerySet):
+    def get_changed_ids(self, objs=None, values=None):
+        return {}
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            changed_ids = self.get_changed_ids(values=kwargs)
+            rows = super().update(**kwargs)
+            catalog_changed.send(sender=self.model, **changed_ids)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            catalog_changed.send(sender=self.model, **self.get_changed_ids(objs=objs))
+        return objs
 
-class ProductQuerySet(models.QuerySet):
+
+class ProductQuerySet(CatalogQuerySet):
     def available(self):
-        products = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
+        return self.filter(is_available=True)
+
+    def get_changed_ids(self, objs=None, values=None):
+        if objs is not None:
+            return {'product_ids': {product.pk for product in objs}}
+        return {'product_ids': set(self.values_list('pk', flat=True))}
+
+    def refresh_availability(self):
+        available_menu_items = RestaurantMenuItem.objects.filter(
+            product=OuterRef('pk'),
+            availability=True,
         )
-        return self.filter(pk__in=products)
+        # обычный update без повторной рассылки catalog_changed
+        return models.QuerySet.update(self, is_available=Exists(available_menu_items))
+
+
+class RestaurantMenuItemQuerySet(CatalogQuerySet):
+    def get_changed_ids(self, objs=None, values=None):
+        if objs is not None:
+            pairs = [(item.restaurant_id, item.product_id) for item in objs]
+        else:
+            pairs = list(self.values_list('restaurant_id', 'product_id'))
+
+        restaurant_ids = {restaurant_id for restaurant_id, _ in pairs}
+        product_ids = {product_id for _, product_id in pairs}
+        # update() может перенести пункты меню к другому ресторану или товару
+        values = values or {}
+        for field, ids in [('restaurant', restaurant_ids), ('product', product_ids)]:
+            value = values.get(field, values.get(f'{field}_id'))
+            if value is not None:
+                ids.add(getattr(value, 'pk', value))
+        return {'restaurant_ids': restaurant_ids, 'product_ids': product_ids}
 
 
 class ProductCategory(models.Model):
@@ -48,6 +112,8 @@ class ProductCategory(models.Model):
         max_length=50
     )
 
+    objects = CatalogQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'категория'
         verbose_name_plural = 'категории'
@@ -78,6 +144,12 @@ class Product(models.Model):
     image = models.ImageField(
         'картинка'
     )
+    image_derivatives = models.JSONField(
+        'уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     special_status = models.BooleanField(
         'спец.предложение',
         default=False,
@@ -88,12 +160,24 @@ class Product(models.Model):
         max_length=200,
         blank=True,
     )
+    is_available = models.BooleanField(
+        'есть в ресторанах',
+        default=False,
+        editable=False,
+        db_index=True,
+    )
 
     objects = ProductQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'товар'
         verbose_name_plural = 'товары'
+        # постраничная выдача каталога идёт по id внутри фильтра
+        indexes = [
+            models.Index(fields=['is_available', 'id']),
+            models.Index(fields=['category', 'is_available', 'id']),
+            models.Index(fields=['special_status', 'is_available', 'id']),
+        ]
 
     def __str__(self):
         return self.name
@@ -118,6 +202,8 @@ class RestaurantMenuItem(models.Model):
         db_index=True
     )
 
+    objects = RestaurantMenuItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'пункт меню ресторана'
         verbose_name_plural = 'пункты меню ресторана'
@@ -128,51 +214,73 @@ class RestaurantMenuItem(models.Model):
     def __str__(self):
         return f"{self.restaurant.name} - {self.product.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # после сохранения нужно обновить и прежние ресторан с товаром, если пункт меню перенесли
+        instance.loaded_ids = (instance.restaurant_id, instance.product_id)
+        return instance
+
+    def get_changed_ids(self):
+        restaurant_ids = {self.restaurant_id}
+        product_ids = {self.product_id}
+        if hasattr(self, 'loaded_ids'):
+            loaded_restaurant_id, loaded_product_id = self.loaded_ids
+            restaurant_ids.add(loaded_restaurant_id)
+            product_ids.add(loaded_product_id)
+        return {'restaurant_ids': restaurant_ids, 'product_ids': product_ids}
+
+    def save(self, *args, **kwargs):
+        # сигналы пересчитывают доступность товаров в той же транзакции, что и сохранение
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self.loaded_ids = (self.restaurant_id, self.product_id)
 
-class OrderQuerySet(models.QuerySet):
-    def get_total_price(self):
-        return self.annotate(price=Sum(F('order_items__price') * F('order_items__quantity')))
 
-    def annotate_available_restaurants(self):
-        order_items = self.prefetch_related('order_items').values_list('id', 'order_items__product_id')
-        order_to_product_ids = defaultdict(set)
-        all_product_ids = set()
+class OrderQuerySet(models.QuerySet):
+    def open(self):
+        return self.filter(status__in=Order.OPEN_STATUSES)
+
+    def refresh_total_price(self):
+        # сумма хранится в заказе, чтобы сортировать по ней страницу заказов через индекс
+        total_prices = (
+            OrderItem.objects
+            .filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total=Sum(F('price') * F('quantity')))
+            .values('total')
+        )
+        return self.update(
+            total_price=Coalesce(Subquery(total_prices), Value(0), output_field=models.DecimalField()),
+            changed_at=timezone.now(),
+        )
 
-        for order_id, product_id in order_items:
-            if product_id is not None:
-                order_to_product_ids[order_id].add(product_id)
-                all_product_ids.add(product_id)
-
-        if not all_product_ids:
-            for order in self:
-                order.available_restaurant_ids = set()
-            return self
-
-        menu_items = (
-            RestaurantMenuItem.objects.filter(
-                product_id__in=all_product_ids,
-                availability=True
-            )
-            .values_list('restaurant_id', 'product_id')
+    def refresh_nearest_distance(self):
+        nearest_distances = (
+            OrderCandidate.objects
+            .filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(nearest=Min('distance_km'))
+            .values('nearest')
         )
+        return self.update(nearest_distance_km=Subquery(nearest_distances))
 
-        restaurant_to_products = defaultdict(set)
-        for restaurant_id, product_id in menu_items:
-            restaurant_to_products[restaurant_id].add(product_id)
+    def annotate_available_restaurants(self):
+        # индекс наличия импортирует модели, поэтому импортируем его здесь
+        from .eligibility import get_eligibility_index
+
+        order_to_product_ids = {order.id: set() for order in self}
+        order_items = (
+            OrderItem.objects
+            .filter(order__in=order_to_product_ids)
+            .values_list('order_id', 'product_id')
+        )
+        for order_id, product_id in order_items:
+            order_to_product_ids[order_id].add(product_id)
 
+        available_restaurant_ids = get_eligibility_index().find_restaurants(order_to_product_ids)
         for order in self:
-            required = order_to_product_ids.get(order.id, set())
-            if not required:
-                order.available_restaurant_ids = set()
-                continue
-
-            suitable_restaurants = set()
-            for restaurant_id, products in restaurant_to_products.items():
-                if required.issubset(products):
-                    suitable_restaurants.add(restaurant_id)
-
-            order.available_restaurant_ids = suitable_restaurants
-
+            order.available_restaurant_ids = available_restaurant_ids[order.id]
         return self
 
 
@@ -187,6 +295,8 @@ class Order(models.Model):
         ('electronic', 'электронно'),
         ('cash', 'наличными')
     ]
+    # заказы, которые видит менеджер и для которых подбираются рестораны
+    OPEN_STATUSES = ['pending', 'processing']
 
     firstname = models.CharField(
         'имя',
@@ -248,16 +358,64 @@ class Order(models.Model):
         blank=True,
         verbose_name="ресторан"
     )
+    candidates_updated_at = models.DateTimeField(
+        'дата подбора ресторанов',
+        blank=True,
+        null=True
+    )
+    total_price = models.DecimalField(
+        'стоимость заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False
+    )
+    nearest_distance_km = models.FloatField(
+        'расстояние до ближайшего ресторана, км',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    changed_at = models.DateTimeField(
+        'дата изменения',
+        default=timezone.now,
+        db_index=True,
+        editable=False
+    )
 
     objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'заказ'
         verbose_name_plural = 'заказы'
+        # страница заказов листается по одному из этих ключей
+        indexes = [
+            models.Index(fields=['status', 'registration_date', 'id']),
+            models.Index(fields=['status', 'total_price', 'id']),
+            models.Index(fields=['status', 'nearest_distance_km', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.firstname} {self.lastname}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # рестораны подбираются заново, только если изменился адрес
+        instance.loaded_address = instance.__dict__.get('address')
+        return instance
+
+    def is_address_changed(self):
+        return getattr(self, 'loaded_address', None) != self.address
+
+    def save(self, *args, **kwargs):
+        # по дате изменения лента на странице менеджера находит, какие строки обновить
+        self.changed_at = timezone.now()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'changed_at'}
+        super().save(*args, **kwargs)
+        self.loaded_address = self.address
+
 
 def validate_quantity(value):
     if value <= 0:
@@ -297,3 +455,207 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.order.firstname} {self.order.lastname} {self.order.address}"
+
+
+class OrderCandidate(models.Model):
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='candidates',
+        verbose_name='заказ'
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name='order_candidates',
+        verbose_name='ресторан'
+    )
+    distance_km = models.FloatField(
+        'расстояние, км',
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        verbose_name = 'ресторан для заказа'
+        verbose_name_plural = 'рестораны для заказов'
+        unique_together = [
+            ['order', 'restaurant']
+        ]
+        indexes = [
+            models.Index(fields=['order', 'distance_km']),
+        ]
+
+    def __str__(self):
+        return f"{self.order} - {self.restaurant}"
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(
+        'ключ',
+        max_length=255,
+        unique=True
+    )
+    request_hash = models.CharField(
+        'хэш тела запроса',
+        max_length=64,
+        default=''
+    )
+    response_status = models.PositiveSmallIntegerField(
+        'код ответа'
+    )
+    response_data = models.JSONField(
+        'тело ответа'
+    )
+    created_at = models.DateTimeField(
+        'дата создания',
+        default=timezone.now
+    )
+    expires_at = models.DateTimeField(
+        'действует до',
+        db_index=True
+    )
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности'
+        verbose_name_plural = 'ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'в очереди'),
+        ('running', 'выполняется'),
+        ('done', 'выполнена'),
+        ('failed', 'ошибка'),
+    ]
+
+    kind = models.CharField(
+        'тип задачи',
+        max_length=50
+    )
+    payload = models.JSONField(
+        'параметры',
+        default=dict,
+        blank=True
+    )
+    status = models.CharField(
+        'статус',
+        max_length=10,
+        default='queued',
+        choices=STATUS_CHOICES
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'число попыток',
+        default=0
+    )
+    run_after = models.DateTimeField(
+        'запустить после',
+        default=timezone.now
+    )
+    created_at = models.DateTimeField(
+        'дата создания',
+        default=timezone.now
+    )
+    started_at = models.DateTimeField(
+        'дата запуска',
+        blank=True,
+        null=True
+    )
+    finished_at = models.DateTimeField(
+        'дата завершения',
+        blank=True,
+        null=True
+    )
+    last_error = models.TextField(
+        'последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}"
+
+
+class BannerQuerySet(models.QuerySet):
+    def active(self, now):
+        return self.filter(
+            Q(starts_at__isnull=True) | Q(starts_at__lte=now),
+            Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+            is_active=True,
+        )
+
+    def get_next_change(self, now):
+        # ближайший момент, когда какой-то баннер появится или пропадёт
+        boundaries = self.filter(is_active=True).aggregate(
+            next_start=Min('starts_at', filter=Q(starts_at__gt=now)),
+            next_end=Min('ends_at', filter=Q(ends_at__gt=now)),
+        )
+        return min(filter(None, boundaries.values()), default=None)
+
+
+class Banner(models.Model):
+    title = models.CharField(
+        'заголовок',
+        max_length=50
+    )
+    text = models.CharField(
+        'текст',
+        max_length=200,
+        blank=True
+    )
+    image = models.ImageField(
+        'картинка',
+        upload_to='banners'
+    )
+    position = models.PositiveIntegerField(
+        'порядок',
+        default=0,
+        db_index=True
+    )
+    is_active = models.BooleanField(
+        'показывать',
+        default=True
+    )
+    starts_at = models.DateTimeField(
+        'показывать с',
+        blank=True,
+        null=True
+    )
+    ends_at = models.DateTimeField(
+        'показывать до',
+        blank=True,
+        null=True
+    )
+
+    objects = BannerQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return self.title
+
+    def clean(self):
+        if self.starts_at and self.ends_at and self.starts_at >= self.ends_at:
+            raise ValidationError({'ends_at': 'Показ должен закончиться позже, чем начнётся.'})
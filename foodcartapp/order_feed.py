@@ -0,0 +1,10 @@
+from .catalog import bump_version
+
+
+# версия меняется при любом изменении заказов; по ней лента на странице менеджера
+# понимает, что пора сходить в базу
+VERSION_KEY = 'orders:version'
+
+
+def bump_orders_version():
+    bump_version(VERSION_KEY)
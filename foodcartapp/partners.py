@@ -0,0 +1,23 @@
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+
+def get_partner(request):
+    # партнёр передаёт свой ключ в заголовке X-Api-Key
+    api_key = request.headers.get('X-Api-Key')
+    if not api_key:
+        return None
+    for partner, partner_key in settings.ORDER_BATCH_API_KEYS.items():
+        if hmac.compare_digest(api_key.encode(), partner_key.encode()):
+            return partner
+    return None
+
+
+class IsPartner(BasePermission):
+    message = 'Нужен ключ партнёра в заголовке X-Api-Key.'
+
+    def has_permission(self, request, view):
+        request.partner = get_partner(request)
+        return request.partner is not None
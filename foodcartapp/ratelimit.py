@@ -0,0 +1,103 @@
+import math
+import time
+
+import phonenumbers
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+
+PERIODS = {
+    's': 1,
+    'm': 60,
+    'h': 60 * 60,
+    'd': 24 * 60 * 60,
+}
+
+
+def parse_rate(rate):
+    tokens, period = rate.split('/')
+    return int(tokens), PERIODS[period[0]]
+
+
+def consume_token(scope, key, rate):
+    # возвращает, сколько секунд ждать до следующего заказа, или 0, если заказ пропущен;
+    # скользящее окно: счётчик текущего окна плюс убывающая доля предыдущего.
+    # Счётчик меняют только атомарные add/incr/decr, поэтому параллельные запросы
+    # не могут пропустить больше заказов, чем позволяет лимит
+    capacity, period = parse_rate(rate)
+    cache = caches[settings.RATELIMIT_CACHE]
+    now = time.time()
+    window, elapsed = divmod(now / period, 1)
+    cache_key = f'ratelimit:{scope}:{key}:{int(window)}'
+
+    cache.add(cache_key, 0, timeout=math.ceil(2 * period))
+    try:
+        current = cache.incr(cache_key)
+    except ValueError:
+        # ключ вытеснили из кэша между add и incr
+        cache.set(cache_key, 1, timeout=math.ceil(2 * period))
+        current = 1
+    previous = cache.get(f'ratelimit:{scope}:{key}:{int(window) - 1}', 0)
+    if previous * (1 - elapsed) + current <= capacity:
+        return 0
+
+    try:
+        cache.decr(cache_key)
+    except ValueError:
+        pass
+    if current <= capacity:
+        # место освободится, когда доля предыдущего окна уменьшится на один заказ
+        return (1 - (capacity - current) / previous - elapsed) * period
+    return (1 - elapsed) * period
+
+
+def normalize_phonenumber(raw_phonenumber):
+    if not isinstance(raw_phonenumber, str):
+        return None
+    try:
+        phonenumber = phonenumbers.parse(raw_phonenumber, 'RU')
+    except phonenumbers.NumberParseException:
+        return None
+    return phonenumbers.format_number(phonenumber, phonenumbers.PhoneNumberFormat.E164)
+
+
+def get_order_wait_time(ip, raw_phonenumber):
+    rates = settings.ORDER_RATE_LIMITS
+    keys = {
+        'ip': ip,
+        'phone': normalize_phonenumber(raw_phonenumber),
+    }
+
+    wait_time = 0
+    for scope, key in keys.items():
+        if key and rates.get(scope):
+            wait_time = max(wait_time, consume_token(scope, key, rates[scope]))
+    return wait_time
+
+
+def get_retry_after(wait_time):
+    return str(math.ceil(wait_time))
+
+
+class OrderRateThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        raw_phonenumber = None
+        if isinstance(request.data, dict):
+            raw_phonenumber = request.data.get('phonenumber')
+
+        self.wait_time = get_order_wait_time(self.get_ident(request), raw_phonenumber)
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class PartnerRateThrottle(BaseThrottle):
+    # пакет может содержать сотни заказов, поэтому каждый партнёр ограничен отдельно
+    def allow_request(self, request, view):
+        self.wait_time = consume_token('batch', request.partner, settings.ORDER_BATCH_RATE_LIMIT)
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .banners import bump_banners_version
+from .candidates import get_orders_with_products, get_orders_with_restaurants
+from .catalog import bump_catalog_version
+from .eligibility import update_eligibility_index
+from .images import refresh_image_derivatives
+from .menus import bump_menu_versions, get_affected_restaurant_ids
+from .order_feed import bump_orders_version
+from .models import Banner, Order, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .search import update_product_index
+from .signals import catalog_changed
+from .tasks import enqueue, enqueue_batch_on_commit, on_commit_with_ids
+
+
+def bump_menus_and_enqueue_rebuild(restaurant_ids):
+    bump_menu_versions(restaurant_ids)
+    # снимки пересобирает воркер, до этого меню соберётся при первом запросе
+    enqueue('rebuild_menu_snapshots', restaurant_ids=restaurant_ids)
+
+
+def refresh_menu_snapshots(restaurant_ids):
+    if restaurant_ids:
+        on_commit_with_ids('rebuild_menu_snapshots', restaurant_ids, bump_menus_and_enqueue_rebuild)
+
+
+def refresh_candidates(order_ids):
+    if order_ids:
+        enqueue_batch_on_commit('refresh_order_candidates', 'order_ids', order_ids)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def notify_product_changed(sender, instance, **kwargs):
+    catalog_changed.send(sender=sender, product_ids={instance.pk})
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_image(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_image_derivatives(instance)
+
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def notify_category_changed(sender, instance, **kwargs):
+    catalog_changed.send(sender=sender)
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def notify_menu_item_changed(sender, instance, **kwargs):
+    catalog_changed.send(sender=sender, **instance.get_changed_ids())
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def notify_restaurant_changed(sender, instance, **kwargs):
+    refresh_menu_snapshots([instance.pk])
+
+
+@receiver(post_save, sender=Restaurant)
+def refresh_restaurant_candidates(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw and instance.is_address_changed():
+        refresh_candidates(get_orders_with_restaurants([instance.pk]))
+
+
+@receiver(pre_delete, sender=Restaurant)
+def refresh_deleted_restaurant_candidates(sender, instance, **kwargs):
+    # после удаления уже не узнать, у каких заказов ресторан был ближайшим
+    refresh_candidates(get_orders_with_restaurants([instance.pk]))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_total_price(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Order.objects.filter(pk=instance.order_id).refresh_total_price()
+        transaction.on_commit(bump_orders_version)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def notify_order_changed(sender, **kwargs):
+    transaction.on_commit(bump_orders_version)
+
+
+@receiver(post_save, sender=Order)
+def refresh_order_address_candidates(sender, instance, raw=False, **kwargs):
+    # заказы из API создаются через bulk_create и ставят задачу сами
+    if not raw and instance.status in Order.OPEN_STATUSES and instance.is_address_changed():
+        refresh_candidates([instance.pk])
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def invalidate_banners_cache(sender, **kwargs):
+    transaction.on_commit(bump_banners_version)
+
+
+@receiver(catalog_changed)
+def invalidate_catalog_cache(sender, product_ids=None, **kwargs):
+    def bump_version():
+        previous_version, version = bump_catalog_version()
+        update_product_index(product_ids, previous_version, version)
+
+    # до коммита другие запросы ещё видят старые данные и закэшировали бы их под новой версией
+    transaction.on_commit(bump_version)
+
+
+@receiver(catalog_changed, sender=RestaurantMenuItem)
+def invalidate_eligibility_index(sender, product_ids=None, **kwargs):
+    transaction.on_commit(lambda: update_eligibility_index(product_ids))
+
+
+@receiver(catalog_changed, sender=RestaurantMenuItem)
+def refresh_product_availability(sender, product_ids=None, **kwargs):
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    products.refresh_availability()
+
+
+@receiver(catalog_changed)
+def invalidate_menu_snapshots(sender, product_ids=None, restaurant_ids=None, **kwargs):
+    refresh_menu_snapshots(get_affected_restaurant_ids(product_ids, restaurant_ids))
+
+
+@receiver(catalog_changed, sender=RestaurantMenuItem)
+def refresh_menu_candidates(sender, product_ids=None, **kwargs):
+    refresh_candidates(get_orders_with_products(product_ids))
@@ -0,0 +1,187 @@
+import heapq
+import re
+import threading
+from collections import defaultdict
+
+from .catalog import get_catalog_version
+from .models import Product
+
+
+SEARCH_LIMIT = 20
+# слова короче длины n-граммы ищутся по началу слова, а не по подстроке
+NGRAM_SIZE = 3
+
+NON_WORD_CHARS = re.compile(r'[\W_]+')
+
+
+def normalize_text(text):
+    # casefold понимает кириллицу в отличие от LIKE в SQLite; «ё» и «е» считаем одной буквой
+    return NON_WORD_CHARS.sub(' ', text.casefold().replace('ё', 'е')).strip()
+
+
+def get_ngrams(word):
+    return {word[start:start + NGRAM_SIZE] for start in range(len(word) - NGRAM_SIZE + 1)}
+
+
+def get_prefixes(word):
+    return {word[:length] for length in range(1, min(len(word), NGRAM_SIZE - 1) + 1)}
+
+
+class ProductSearchIndex:
+    # товары ищутся через словарь слов: n-граммы ведут к словам, а слова — к товарам,
+    # поэтому проверка подстроки идёт по словам, а множества товаров объединяются целиком
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.product_words = {}
+        self.product_name_words = {}
+        self.available = set()
+        self.word_products = defaultdict(set)
+        self.name_word_products = defaultdict(set)
+        self.ngram_words = defaultdict(set)
+        self.prefix_words = defaultdict(set)
+
+    def add_word(self, word):
+        for ngram in get_ngrams(word):
+            self.ngram_words[ngram].add(word)
+        for prefix in get_prefixes(word):
+            self.prefix_words[prefix].add(word)
+
+    def remove_word(self, word):
+        for ngram in get_ngrams(word):
+            self.ngram_words[ngram].discard(word)
+            if not self.ngram_words[ngram]:
+                del self.ngram_words[ngram]
+        for prefix in get_prefixes(word):
+            self.prefix_words[prefix].discard(word)
+            if not self.prefix_words[prefix]:
+                del self.prefix_words[prefix]
+
+    def add(self, product):
+        name_words = set(normalize_text(product.name).split())
+        words = name_words | set(normalize_text(' '.join([
+            product.category.name if product.category else '',
+            product.description,
+        ])).split())
+
+        self.product_words[product.id] = words
+        self.product_name_words[product.id] = name_words
+        if product.is_available:
+            self.available.add(product.id)
+        for word in words:
+            if word not in self.word_products:
+                self.add_word(word)
+            self.word_products[word].add(product.id)
+        for word in name_words:
+            self.name_word_products[word].add(product.id)
+
+    def discard(self, product_id):
+        words = self.product_words.pop(product_id, None)
+        if words is None:
+            return
+        self.available.discard(product_id)
+        for word in words:
+            self.word_products[word].discard(product_id)
+            if not self.word_products[word]:
+                del self.word_products[word]
+                self.remove_word(word)
+        for word in self.product_name_words.pop(product_id):
+            self.name_word_products[word].discard(product_id)
+            if not self.name_word_products[word]:
+                del self.name_word_products[word]
+
+    def rebuild(self, version):
+        # новый индекс собирается в стороне, чтобы не держать блокировку во время запроса к базе
+        fresh_index = ProductSearchIndex()
+        for product in Product.objects.select_related('category'):
+            fresh_index.add(product)
+        with self.lock:
+            self.product_words = fresh_index.product_words
+            self.product_name_words = fresh_index.product_name_words
+            self.available = fresh_index.available
+            self.word_products = fresh_index.word_products
+            self.name_word_products = fresh_index.name_word_products
+            self.ngram_words = fresh_index.ngram_words
+            self.prefix_words = fresh_index.prefix_words
+            self.version = version
+
+    def update(self, product_ids, version):
+        products = list(Product.objects.select_related('category').filter(pk__in=product_ids))
+        with self.lock:
+            for product_id in product_ids:
+                self.discard(product_id)
+            for product in products:
+                self.add(product)
+            self.version = version
+
+    def find_words(self, query_word):
+        # короткие слова запроса ищутся по началу слова, длинные — как подстрока
+        if len(query_word) < NGRAM_SIZE:
+            return self.prefix_words.get(query_word, set())
+        ngrams = sorted(get_ngrams(query_word), key=lambda ngram: len(self.ngram_words.get(ngram, ())))
+        words = self.ngram_words.get(ngrams[0], set())
+        for ngram in ngrams[1:]:
+            words = words & self.ngram_words.get(ngram, set())
+        return {word for word in words if query_word in word}
+
+    def match_products(self, products, words, word_products, product_words):
+        postings = [word_products[word] for word in words if word in word_products]
+        if products is None:
+            return set().union(*postings)
+        # проверка одного кандидата в Python во много раз дороже объединения множеств в C,
+        # поэтому кандидатов перебираем, только когда их намного меньше, чем ссылок в списках
+        if len(products) * 10 < sum(map(len, postings)):
+            return {product for product in products if not words.isdisjoint(product_words[product])}
+        return products & set().union(*postings)
+
+    def search(self, query, limit=SEARCH_LIMIT, available_only=False):
+        query_words = normalize_text(query).split()
+        if not query_words:
+            return []
+
+        with self.lock:
+            products = self.available if available_only else None
+            name_products = None
+            # длинные слова отсекают больше товаров, с них и начинаем
+            for query_word in sorted(query_words, key=len, reverse=True):
+                words = self.find_words(query_word)
+                products = self.match_products(products, words, self.word_products, self.product_words)
+                if not products:
+                    return []
+                name_products = self.match_products(
+                    name_products if name_products is not None else products,
+                    words,
+                    self.name_word_products,
+                    self.product_name_words,
+                )
+
+        # сначала товары, в названии которых есть все слова запроса
+        if limit is None:
+            return sorted(name_products) + sorted(products - name_products)
+        found = heapq.nsmallest(limit, name_products)
+        if len(found) < limit:
+            found += heapq.nsmallest(limit - len(found), products - name_products)
+        return found
+
+
+product_index = ProductSearchIndex()
+
+
+def get_product_index():
+    # индекс живёт в памяти процесса; изменения из других процессов видны по версии каталога
+    version = get_catalog_version()
+    if product_index.version != version:
+        product_index.rebuild(version)
+    return product_index
+
+
+def search_products(query, limit=SEARCH_LIMIT, available_only=False):
+    return get_product_index().search(query, limit=limit, available_only=available_only)
+
+
+def update_product_index(product_ids, previous_version, version):
+    # индекс, отставший от каталога, целиком пересоберётся при следующем поиске
+    if product_ids is None or previous_version is None or product_index.version != previous_version:
+        product_index.version = None
+        return
+    product_index.update(product_ids, version)
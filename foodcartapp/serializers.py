@@ -1,13 +1,114 @@
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
-from foodcartapp.models import Order, OrderItem
+from foodcartapp.models import MAX_ID, Order, OrderItem, Product
+from foodcartapp.order_feed import bump_orders_version
+from foodcartapp.tasks import enqueue_on_commit
+
+
+def collect_item_product_ids(raw_items):
+    product_ids = set()
+    for item in raw_items:
+        if not isinstance(item, dict):
+            continue
+        product_id = item.get('product')
+        if isinstance(product_id, bool):
+            continue
+        try:
+            product_ids.add(int(product_id))
+        except (TypeError, ValueError):
+            continue
+    return product_ids
+
+
+def collect_product_ids(raw_orders):
+    product_ids = set()
+    for raw_order in raw_orders:
+        if not isinstance(raw_order, dict):
+            continue
+        items = raw_order.get('products')
+        if isinstance(items, list):
+            product_ids |= collect_item_product_ids(items)
+    return product_ids
+
+
+def load_products(product_ids):
+    # id вне диапазона заведомо не найдутся и попадут в ошибку «Товары с id … не найдены»
+    return Product.objects.in_bulk([pk for pk in product_ids if 0 < pk <= MAX_ID])
+
+
+def create_orders(orders_data):
+    orders = [
+        Order(
+            **{key: value for key, value in order_data.items() if key != 'products'},
+            total_price=sum(item['product'].price * item['quantity'] for item in order_data['products']),
+        )
+        for order_data in orders_data
+    ]
+    Order.objects.bulk_create(orders)
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product=item['product'],
+            quantity=item['quantity'],
+            price=item['product'].price,
+        )
+        for order, order_data in zip(orders, orders_data)
+        for item in order_data['products']
+    ])
+    enqueue_on_commit(
+        'refresh_order_candidates',
+        order_ids=[order.pk for order in orders],
+    )
+    transaction.on_commit(bump_orders_version)
+    return orders
+
+
+class ProductField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        products = self.context.get('products')
+        if products is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        product = products.get(pk)
+        if product is None:
+            self.fail('does_not_exist', pk_value=data)
+        return product
+
+
+class OrderItemListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            products = self.context.setdefault('products', {})
+            product_ids = collect_item_product_ids(data)
+
+            missing_ids = product_ids - products.keys()
+            if missing_ids:
+                products.update(load_products(missing_ids))
+
+            unknown_ids = sorted(product_ids - products.keys())
+            if unknown_ids:
+                raise ValidationError(
+                    f"Товары с id {', '.join(map(str, unknown_ids))} не найдены."
+                )
+        return super().to_internal_value(data)
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    product = ProductField(queryset=Product.objects.all())
+
     class Meta:
         model = OrderItem
         fields = ['product', 'quantity']
+        list_serializer_class = OrderItemListSerializer
 
     def validate_quantity(self, value):
         if value <= 0:
@@ -26,3 +127,7 @@ class OrderSerializer(serializers.ModelSerializer):
         if not value:
             raise ValidationError("Это поле не может быть пустым.")
         return value
+
+    def create(self, validated_data):
+        order, = create_orders([validated_data])
+        return order
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+
+# отправляется при любом изменении товаров, категорий и меню ресторанов,
+# в том числе при массовых update() и bulk_create();
+# product_ids и restaurant_ids — затронутые записи, None — неизвестно какие
+catalog_changed = Signal()
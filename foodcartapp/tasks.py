@@ -0,0 +1,129 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .candidates import refresh_order_candidates
+from .menus import rebuild_menu_snapshots
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+DONE_JOBS_TTL = timedelta(days=1)
+
+handlers = {
+    'refresh_order_candidates': refresh_order_candidates,
+    'rebuild_menu_snapshots': rebuild_menu_snapshots,
+}
+
+
+def enqueue(kind, **payload):
+    return Job.objects.create(kind=kind, payload=payload)
+
+
+def enqueue_on_commit(kind, **payload):
+    transaction.on_commit(lambda: enqueue(kind, **payload))
+
+
+class IdsBatch:
+    def __init__(self, func):
+        self.func = func
+        self.ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        self.func(sorted(self.ids))
+
+
+def on_commit_with_ids(name, ids, func):
+    # каскадное и массовое удаление шлёт сигнал на каждую запись, поэтому id копятся
+    # до коммита, и func вызывается один раз со всеми id транзакции
+    connection = transaction.get_connection()
+    batches = connection.__dict__.setdefault('pending_id_batches', {})
+    batch = batches.get(name)
+    # после коммита или отката пачки уже нет среди отложенных вызовов, начинаем новую
+    if batch is None or batch.done or not any(callback is batch for _, callback, _ in connection.run_on_commit):
+        batch = batches[name] = IdsBatch(func)
+        batch.ids.update(ids)
+        transaction.on_commit(batch)
+    else:
+        batch.ids.update(ids)
+
+
+def enqueue_batch_on_commit(kind, field, ids):
+    on_commit_with_ids(kind, ids, lambda ids: enqueue(kind, **{field: ids}))
+
+
+def claim_job():
+    while True:
+        job = (
+            Job.objects
+            .filter(status='queued', run_after__lte=timezone.now())
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if not job:
+            return None
+
+        # соседний воркер мог забрать задачу между SELECT и UPDATE
+        claimed = (
+            Job.objects
+            .filter(pk=job.pk, status='queued')
+            .update(status='running', started_at=timezone.now(), attempts=F('attempts') + 1)
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def run_job(job):
+    handler = handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f'Неизвестный тип задачи: {job.kind}')
+        handler(**job.payload)
+    except Exception:
+        logger.exception('Задача %s завершилась с ошибкой', job)
+        job.last_error = traceback.format_exc()
+        if handler is not None and job.attempts < MAX_ATTEMPTS:
+            job.status = 'queued'
+            job.run_after = timezone.now() + RETRY_DELAY * job.attempts
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'run_after', 'finished_at', 'last_error'])
+
+
+def run_pending_jobs():
+    processed = 0
+    while job := claim_job():
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def requeue_stale_jobs():
+    return (
+        Job.objects
+        .filter(status='running', started_at__lt=timezone.now() - STALE_JOB_TIMEOUT)
+        .update(status='queued')
+    )
+
+
+def delete_finished_jobs():
+    return (
+        Job.objects
+        .filter(status='done', finished_at__lt=timezone.now() - DONE_JOBS_TTL)
+        .delete()
+    )
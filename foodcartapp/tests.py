@@ -0,0 +1,568 @@
+import gzip
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+import brotli
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+
+from star_burger.testing import CacheResetTestCase
+
+from . import ratelimit, views
+from .eligibility import get_eligibility_index
+from .management.commands.benchmark_eligibility import load_restaurant_products, match_with_sets
+from .models import IdempotencyKey, Job, Order, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .search import get_product_index, product_index, search_products
+from .signals import catalog_changed
+
+
+@override_settings(ORDER_RATE_LIMITS={})
+class OrderIntakeTest(CacheResetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Чизбургер', price=100)
+
+    def make_order(self, **fields):
+        return {
+            'products': [{'product': self.product.pk, 'quantity': 2}],
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79291234567',
+            'address': 'Москва, Тверская, 1',
+            **fields,
+        }
+
+    def post_order(self, order, **headers):
+        return self.client.post('/api/order/', order, content_type='application/json', headers=headers)
+
+    def test_order_is_created(self):
+        response = self.post_order(self.make_order())
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.json()['id'])
+        self.assertEqual(order.total_price, 200)
+
+    def test_idempotent_replay_returns_stored_order(self):
+        first = self.post_order(self.make_order(), Idempotency_Key='order-1')
+        second = self.post_order(self.make_order(), Idempotency_Key='order-1')
+
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_key_reused_for_another_order_is_rejected(self):
+        self.post_order(self.make_order(), Idempotency_Key='order-1')
+        response = self.post_order(self.make_order(address='Москва, Арбат, 2'), Idempotency_Key='order-1')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertNotIn('firstname', response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_concurrent_duplicate_returns_stored_order(self):
+        stored = {'id': 1, 'firstname': 'Иван'}
+        request_hash = views.get_request_hash(self.make_order())
+
+        def store_key_first(key, request_hash):
+            # параллельный запрос с тем же ключом сохраняет заказ между проверкой и записью
+            IdempotencyKey.objects.create(
+                key=key,
+                request_hash=request_hash,
+                response_status=201,
+                response_data=stored,
+                expires_at=timezone.now() + timedelta(days=1),
+            )
+            patcher.stop()
+
+        patcher = mock.patch.object(views, 'get_idempotent_response', side_effect=store_key_first)
+        patcher.start()
+        response = self.post_order(self.make_order(), Idempotency_Key='order-1')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), stored)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(IdempotencyKey.objects.get().request_hash, request_hash)
+
+    def test_unknown_product_is_rejected(self):
+        response = self.post_order(self.make_order(products=[{'product': self.product.pk + 1, 'quantity': 1}]))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(self.product.pk + 1), response.json()['products'][0])
+
+    def test_overflowing_product_id_is_rejected(self):
+        response = self.post_order(self.make_order(products=[{'product': 10 ** 30, 'quantity': 1}]))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('не найдены', response.json()['products'][0])
+
+    @override_settings(ORDER_BATCH_API_KEYS={'partner': 'secret'}, ORDER_BATCH_RATE_LIMIT='100/min')
+    def test_batch_reports_overflowing_product_id_per_order(self):
+        response = self.client.post(
+            '/api/orders/batch/',
+            [self.make_order(), self.make_order(products=[{'product': 10 ** 30, 'quantity': 1}])],
+            content_type='application/json',
+            headers={'X-Api-Key': 'secret'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()], ['created', 'error'])
+
+    def test_batch_requires_partner_key(self):
+        response = self.client.post('/api/orders/batch/', [self.make_order()], content_type='application/json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Order.objects.exists())
+
+
+class ConsumeTokenTest(CacheResetTestCase):
+    # начало минутного окна, чтобы доли окна в проверках были ровными
+    started_at = 60 * 1_000_000
+
+    def consume_at(self, seconds):
+        with mock.patch.object(ratelimit.time, 'time', return_value=self.started_at + seconds):
+            return ratelimit.consume_token('test', 'client', '2/min')
+
+    def test_window_rolls_over(self):
+        self.assertEqual(self.consume_at(0), 0)
+        self.assertEqual(self.consume_at(0), 0)
+        self.assertAlmostEqual(self.consume_at(1), 59)
+        # в начале следующего окна предыдущее ещё учитывается целиком
+        self.assertAlmostEqual(self.consume_at(60), 30)
+        # к середине окна его доля уменьшилась вдвое
+        self.assertEqual(self.consume_at(90), 0)
+        self.assertGreater(self.consume_at(90), 0)
+        self.assertEqual(self.consume_at(180), 0)
+
+    def test_rejected_requests_do_not_use_up_the_limit(self):
+        self.consume_at(0)
+        self.consume_at(0)
+        for _ in range(10):
+            self.consume_at(30)
+
+        self.assertEqual(self.consume_at(120), 0)
+        self.assertEqual(self.consume_at(120), 0)
+
+    def test_phone_numbers_are_normalized(self):
+        self.assertEqual(ratelimit.normalize_phonenumber('8 (929) 123-45-67'), '+79291234567')
+        self.assertEqual(ratelimit.normalize_phonenumber('+7 929 123 45 67'), '+79291234567')
+        self.assertIsNone(ratelimit.normalize_phonenumber('не телефон'))
+        self.assertIsNone(ratelimit.normalize_phonenumber(79291234567))
+
+
+@override_settings(ORDER_RATE_LIMITS={'ip': '100/min', 'phone': '1/min'})
+class OrderRateLimitTest(CacheResetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Чизбургер', price=100)
+
+    def post_order(self, phonenumber='+79291234567', **headers):
+        order = {
+            'products': [{'product': self.product.pk, 'quantity': 1}],
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': phonenumber,
+            'address': 'Москва, Тверская, 1',
+        }
+        return self.client.post('/api/order/', order, content_type='application/json', headers=headers)
+
+    def test_limit_answers_with_retry_after(self):
+        self.assertEqual(self.post_order().status_code, 201)
+        response = self.post_order()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_phone_limit_counts_normalized_numbers(self):
+        self.assertEqual(self.post_order('+79291234567').status_code, 201)
+
+        self.assertEqual(self.post_order('8 (929) 123-45-67').status_code, 429)
+        self.assertEqual(self.post_order('+79297654321').status_code, 201)
+
+    def test_idempotent_replays_do_not_use_up_the_limit(self):
+        first = self.post_order(Idempotency_Key='order-1')
+        replays = [self.post_order(Idempotency_Key='order-1') for _ in range(3)]
+
+        self.assertEqual([response.status_code for response in replays], [201, 201, 201])
+        self.assertTrue(all(response.json() == first.json() for response in replays))
+        self.assertEqual(self.post_order(Idempotency_Key='order-2').status_code, 429)
+
+
+class ImageDerivativesTest(CacheResetTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def save_image(self, name, color):
+        buffer = BytesIO()
+        Image.new('RGB', (600, 400), color).save(buffer, 'JPEG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def test_saving_product_sends_catalog_changed_once(self):
+        receiver = mock.Mock()
+        catalog_changed.connect(receiver)
+        self.addCleanup(catalog_changed.disconnect, receiver)
+
+        product = Product.objects.create(name='Чизбургер', price=100, image=self.save_image('products/a.jpg', 'red'))
+
+        self.assertEqual(receiver.call_count, 1)
+        self.assertEqual(product.image_derivatives['card']['width'], 400)
+
+    def test_previous_derivatives_are_deleted_after_commit(self):
+        product = Product.objects.create(name='Чизбургер', price=100, image=self.save_image('products/a.jpg', 'red'))
+        previous_files = [product.image_derivatives['thumb']['fallback'], product.image_derivatives['thumb']['webp']]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.image = self.save_image('products/b.jpg', 'blue')
+            product.save()
+            self.assertTrue(all(default_storage.exists(name) for name in previous_files))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(any(default_storage.exists(name) for name in previous_files))
+        product.refresh_from_db()
+        self.assertEqual(product.image_derivatives['source'], 'products/b.jpg')
+
+
+class MenuJobsTest(CacheResetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurants = [
+            Restaurant.objects.create(name=f'Ресторан {number}', address=f'Москва, улица {number}')
+            for number in range(2)
+        ]
+        products = [Product.objects.create(name=f'Бургер {number}', price=100) for number in range(30)]
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(restaurant=restaurant, product=product)
+            for restaurant in cls.restaurants
+            for product in products
+        ])
+
+    def test_cascade_delete_queues_one_job(self):
+        Job.objects.all().delete()
+        restaurant_id = self.restaurants[0].pk
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Restaurant.objects.get(pk=restaurant_id).delete()
+
+        jobs = list(Job.objects.values_list('kind', 'payload'))
+        self.assertEqual(jobs, [('rebuild_menu_snapshots', {'restaurant_ids': [restaurant_id]})])
+
+    def test_bulk_delete_of_menu_items_queues_one_job(self):
+        Job.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.filter(product__name__in=['Бургер 1', 'Бургер 2']).delete()
+
+        jobs = list(Job.objects.values_list('kind', 'payload'))
+        restaurant_ids = sorted(restaurant.pk for restaurant in self.restaurants)
+        self.assertEqual(jobs, [('rebuild_menu_snapshots', {'restaurant_ids': restaurant_ids})])
+
+    def test_separate_transactions_queue_separate_jobs(self):
+        Job.objects.all().delete()
+
+        for restaurant in self.restaurants:
+            with self.captureOnCommitCallbacks(execute=True):
+                restaurant.name = f'{restaurant.name} на углу'
+                restaurant.save()
+
+        self.assertEqual(Job.objects.filter(kind='rebuild_menu_snapshots').count(), 2)
+
+
+class ProductAvailabilityTest(CacheResetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.restaurants = [
+            Restaurant.objects.create(name=f'Ресторан {number}', address=f'Москва, улица {number}')
+            for number in range(2)
+        ]
+        # bulk_create не запускает уменьшение картинок, файлов которых в тестах нет
+        cls.burger, cls.fries = Product.objects.bulk_create([
+            Product(name='Чизбургер', price=100, image='products/burger.jpg'),
+            Product(name='Картошка фри', price=50, image='products/fries.jpg'),
+        ])
+
+    def assertAvailable(self, *products):
+        expected = sorted(product.pk for product in products)
+        self.assertEqual(list(Product.objects.available().order_by('pk').values_list('pk', flat=True)), expected)
+        response = self.client.get('/api/products/')
+        self.assertEqual(sorted(product['id'] for product in response.json()), expected)
+
+    def test_menu_item_save(self):
+        self.assertAvailable()
+        menu_item = RestaurantMenuItem(restaurant=self.restaurants[0], product=self.burger)
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item.save()
+        self.assertAvailable(self.burger)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item.availability = False
+            menu_item.save()
+        self.assertAvailable()
+
+    def test_menu_items_queryset_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.bulk_create([
+                RestaurantMenuItem(restaurant=restaurant, product=product)
+                for restaurant in self.restaurants
+                for product in [self.burger, self.fries]
+            ])
+        self.assertAvailable(self.burger, self.fries)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.filter(product=self.burger).update(availability=False)
+        self.assertAvailable(self.fries)
+
+        # товар остаётся в продаже, пока он есть хотя бы в одном ресторане
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.filter(restaurant=self.restaurants[0], product=self.burger).update(
+                availability=True,
+            )
+        self.assertAvailable(self.burger, self.fries)
+
+    def test_menu_items_bulk_create(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.bulk_create([
+                RestaurantMenuItem(restaurant=self.restaurants[0], product=self.burger),
+                RestaurantMenuItem(restaurant=self.restaurants[0], product=self.fries, availability=False),
+            ])
+
+        self.assertAvailable(self.burger)
+
+    def test_menu_items_bulk_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_items = RestaurantMenuItem.objects.bulk_create([
+                RestaurantMenuItem(restaurant=self.restaurants[0], product=product)
+                for product in [self.burger, self.fries]
+            ])
+        self.assertAvailable(self.burger, self.fries)
+
+        for menu_item in menu_items:
+            menu_item.availability = menu_item.product == self.fries
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.bulk_update(menu_items, ['availability'])
+
+        self.assertAvailable(self.fries)
+
+    def test_restaurant_cascade_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.bulk_create([
+                RestaurantMenuItem(restaurant=self.restaurants[0], product=self.burger),
+                RestaurantMenuItem(restaurant=self.restaurants[0], product=self.fries),
+                RestaurantMenuItem(restaurant=self.restaurants[1], product=self.fries),
+            ])
+        self.assertAvailable(self.burger, self.fries)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Restaurant.objects.get(pk=self.restaurants[0].pk).delete()
+
+        self.assertAvailable(self.fries)
+
+
+class CatalogResponseTest(CacheResetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = ProductCategory.objects.create(name='Бургеры')
+        cls.restaurant = Restaurant.objects.create(name='Ресторан', address='Москва, Тверская, 1')
+        cls.product, = Product.objects.bulk_create([
+            Product(name='Чизбургер', price=100, category=cls.category, image='products/burger.jpg'),
+        ])
+        cls.menu_item = RestaurantMenuItem.objects.create(restaurant=cls.restaurant, product=cls.product)
+        cls.menu_url = f'/api/restaurants/{cls.restaurant.pk}/menu/'
+
+    def test_category_edit_changes_catalog_and_menus(self):
+        catalog = self.client.get('/api/products/')
+        menu = self.client.get(self.menu_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Бургеры и роллы'
+            self.category.save()
+
+        new_catalog = self.client.get('/api/products/')
+        self.assertNotEqual(new_catalog['ETag'], catalog['ETag'])
+        self.assertEqual(new_catalog.json()[0]['category']['name'], 'Бургеры и роллы')
+        new_menu = self.client.get(self.menu_url)
+        self.assertNotEqual(new_menu['ETag'], menu['ETag'])
+        self.assertEqual(new_menu.json()['products'][0]['category']['name'], 'Бургеры и роллы')
+
+    def test_menu_edit_changes_menu(self):
+        menu = self.client.get(self.menu_url)
+        self.assertEqual([product['id'] for product in menu.json()['products']], [self.product.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.menu_item.availability = False
+            self.menu_item.save()
+
+        new_menu = self.client.get(self.menu_url)
+        self.assertNotEqual(new_menu['ETag'], menu['ETag'])
+        self.assertEqual(new_menu.json()['products'], [])
+
+    def test_matching_etag_answers_not_modified(self):
+        for url in ['/api/products/', self.menu_url, '/api/banners/']:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                cached = self.client.get(url, headers={'If-None-Match': response['ETag']})
+
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached.content, b'')
+                self.assertEqual(cached['ETag'], response['ETag'])
+                self.assertIn('Accept-Encoding', cached['Vary'])
+
+    def test_encoding_follows_accept_encoding(self):
+        body = self.client.get('/api/products/').content
+        cases = [
+            ('', None),
+            ('identity', None),
+            ('gzip', 'gzip'),
+            ('gzip, br', 'br'),
+            ('br;q=0, gzip;q=0.5', 'gzip'),
+            ('*', 'br'),
+            ('deflate', None),
+        ]
+        for accept_encoding, encoding in cases:
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.client.get('/api/products/', headers={'Accept-Encoding': accept_encoding})
+
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                decompress = {'gzip': gzip.decompress, 'br': brotli.decompress}.get(encoding, bytes)
+                self.assertEqual(decompress(response.content), body)
+
+    def test_every_encoding_has_its_own_etag(self):
+        etags = {
+            encoding: self.client.get('/api/products/', headers={'Accept-Encoding': encoding})['ETag']
+            for encoding in ['br', 'gzip', 'identity']
+        }
+        self.assertEqual(len(set(etags.values())), 3)
+
+        # ETag сжатого ответа не подходит клиенту, который получит другую кодировку
+        response = self.client.get(
+            '/api/products/',
+            headers={'Accept-Encoding': 'identity', 'If-None-Match': etags['gzip']},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+
+
+class EligibilityIndexTest(CacheResetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # больше 8 ресторанов, чтобы маски занимали несколько байт
+        cls.restaurants = [
+            Restaurant.objects.create(name=f'Ресторан {number}', address=f'Москва, улица {number}')
+            for number in range(20)
+        ]
+        cls.products = Product.objects.bulk_create([
+            Product(name=f'Бургер {number}', price=100, image='products/burger.jpg')
+            for number in range(12)
+        ])
+        generator = random.Random(1)
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(restaurant=restaurant, product=product, availability=generator.random() < 0.8)
+            for restaurant in cls.restaurants
+            for product in cls.products
+            if generator.random() < 0.9
+        ])
+        product_ids = [product.pk for product in cls.products]
+        cls.orders = {order_id: set(generator.sample(product_ids, generator.randint(1, 4))) for order_id in range(50)}
+
+    def assertMatchesSets(self):
+        restaurant_to_products = load_restaurant_products(set().union(*self.orders.values()))
+        expected = match_with_sets(self.orders, restaurant_to_products)
+        self.assertEqual(get_eligibility_index().find_restaurants(self.orders), expected)
+        self.assertTrue(any(len(restaurant_ids) > 8 for restaurant_ids in expected.values()))
+        return expected
+
+    def test_index_matches_subset_check(self):
+        self.assertMatchesSets()
+        # второй раз маски берутся из индекса
+        self.assertMatchesSets()
+
+    def test_order_without_products_has_no_restaurants(self):
+        # проверка подмножества подобрала бы такому заказу все рестораны
+        self.assertEqual(get_eligibility_index().find_restaurants({1: set()}), {1: set()})
+
+    def test_index_follows_menu_changes(self):
+        previous = self.assertMatchesSets()
+        changed_products = self.products[:3]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RestaurantMenuItem.objects.filter(
+                product__in=changed_products,
+                restaurant__in=self.restaurants[:10],
+            ).update(availability=False)
+            RestaurantMenuItem.objects.filter(restaurant=self.restaurants[15], product=self.products[0]).delete()
+            RestaurantMenuItem.objects.update_or_create(
+                restaurant=self.restaurants[19],
+                product=self.products[1],
+                defaults={'availability': True},
+            )
+
+        self.assertNotEqual(self.assertMatchesSets(), previous)
+
+
+class ProductSearchIndexTest(CacheResetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        drinks = ProductCategory.objects.create(name='Напитки')
+        cls.hedgehog, cls.cheeseburger, cls.juice, cls.burger, cls.lemonade = Product.objects.bulk_create([
+            Product(name='Ёжик в тумане', price=100, description='К бургеру', image='products/a.jpg', is_available=True),
+            Product(name='Чизбургер', price=100, image='products/b.jpg', is_available=True),
+            Product(name='Сок', price=100, category=drinks, image='products/c.jpg', is_available=True),
+            Product(name='Бургер', price=100, image='products/d.jpg', is_available=True),
+            Product(name='Лимонад', price=100, category=drinks, image='products/e.jpg'),
+        ])
+
+    def search(self, query, **kwargs):
+        return search_products(query, limit=None, **kwargs)
+
+    def test_yo_is_folded_into_ye(self):
+        self.assertEqual(self.search('ежик'), [self.hedgehog.pk])
+        self.assertEqual(self.search('ЁЖИК'), [self.hedgehog.pk])
+
+    def test_short_words_match_word_prefix(self):
+        self.assertEqual(self.search('чи'), [self.cheeseburger.pk])
+        self.assertEqual(self.search('из'), [])
+        self.assertEqual(self.search('изб'), [self.cheeseburger.pk])
+
+    def test_all_query_words_must_match(self):
+        self.assertEqual(self.search('напитки сок'), [self.juice.pk])
+        self.assertEqual(self.search('напитки бургер'), [])
+        self.assertEqual(self.search(' ,.- '), [])
+
+    def test_name_matches_come_first(self):
+        self.assertEqual(self.search('бургер'), [self.cheeseburger.pk, self.burger.pk, self.hedgehog.pk])
+        self.assertEqual(search_products('бургер', limit=1), [self.cheeseburger.pk])
+        self.assertEqual(self.search('напитки'), [self.juice.pk, self.lemonade.pk])
+
+    def test_unavailable_products_are_skipped_on_request(self):
+        self.assertEqual(self.search('лимонад'), [self.lemonade.pk])
+        self.assertEqual(self.search('лимонад', available_only=True), [])
+
+    def test_index_is_updated_in_place(self):
+        get_product_index()
+
+        with mock.patch.object(product_index, 'rebuild') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                Product.objects.filter(pk=self.cheeseburger.pk).update(name='Гамбургер')
+            self.assertEqual(self.search('чиз'), [])
+            self.assertEqual(self.search('гамб'), [self.cheeseburger.pk])
+            self.assertNotIn('чиз', product_index.ngram_words)
+            self.assertNotIn('чизбургер', product_index.word_products)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Product.objects.filter(pk=self.juice.pk).delete()
+            self.assertEqual(self.search('сок'), [])
+            self.assertEqual(self.search('напитки'), [self.lemonade.pk])
+
+        rebuild.assert_not_called()
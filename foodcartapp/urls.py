@@ -1,12 +1,28 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order
+from . import views
 
 
 app_name = "foodcartapp"
 
-urlpatterns = [
-    path('products/', product_list_api),
-    path('banners/', banners_list_api),
-    path('order/', register_order),
+if settings.ASYNC_API:
+    urlpatterns = [
+        path('products/', views.async_product_list_api),
+        path('products/search/', views.async_product_search_api),
+        path('banners/', views.async_banners_list_api),
+        path('restaurants/<int:restaurant_id>/menu/', views.async_restaurant_menu_api),
+        path('order/', views.async_register_order),
+    ]
+else:
+    urlpatterns = [
+        path('products/', views.product_list_api),
+        path('products/search/', views.product_search_api),
+        path('banners/', views.banners_list_api),
+        path('restaurants/<int:restaurant_id>/menu/', views.restaurant_menu_api),
+        path('order/', views.register_order),
+    ]
+
+urlpatterns += [
+    path('orders/batch/', views.register_orders_batch),
 ]
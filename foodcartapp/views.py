@@ -1,102 +1,345 @@
-from django.templatetags.static import static
-from django.http import JsonResponse
-from django.db import transaction
+import hashlib
+import hmac
+import json
+from datetime import timedelta
 
-from rest_framework.decorators import api_view
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import Throttled
 from rest_framework import status
 
-from .models import Product, Order, OrderItem
+from .banners import get_banners_response
+from .catalog import (
+    aget_catalog_page,
+    aget_catalog_version,
+    aget_product_catalog,
+    get_catalog_page,
+    get_catalog_validators,
+    get_catalog_version,
+    dump_product,
+    get_product_catalog,
+    parse_int,
+    parse_page_query,
+)
+from . import fastjson
+from .menus import (
+    aget_menu_version,
+    aget_restaurant_menu,
+    get_menu_validators,
+    get_menu_version,
+    get_restaurant_menu,
+)
+from .compression import choose_encoding
+from .models import Product, IdempotencyKey
+from .partners import IsPartner
+from .ratelimit import (
+    OrderRateThrottle,
+    PartnerRateThrottle,
+    get_order_wait_time,
+    get_retry_after,
+)
+from .search import SEARCH_LIMIT, search_products
+
+from .serializers import OrderSerializer, collect_product_ids, create_orders, load_products
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(fastjson.dumps(data), content_type='application/json', status=status)
+
+
+def get_precompressed_response(request, tag, last_modified):
+    encoding = choose_encoding(request)
+    # у каждого сжатого варианта свой ETag, иначе кэши перепутают их между собой
+    etag = f'"{tag}-{encoding}"'
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return encoding, etag, response
+
+
+def finalize_precompressed_response(response, encoding, etag, last_modified):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    # браузер хранит ответ, но каждый раз сверяет его с сервером
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if response.status_code == status.HTTP_200_OK and encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    return response
 
-from .serializers import OrderSerializer
+
+def make_precompressed_response(request, tag, last_modified, get_variants):
+    encoding, etag, response = get_precompressed_response(request, tag, last_modified)
+    if response is None:
+        response = HttpResponse(get_variants()[encoding], content_type='application/json')
+    return finalize_precompressed_response(response, encoding, etag, last_modified)
 
 
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    banners = get_banners_response()
+    return make_precompressed_response(
+        request,
+        banners['tag'],
+        banners['last_modified'],
+        lambda: banners['variants'],
+    )
+
+
+async def async_banners_list_api(request):
+    # после изменения баннеров ответ собирается заново из базы, а ORM работает только в синхронном коде
+    return await sync_to_async(banners_list_api)(request)
 
 
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    try:
+        page_query = parse_page_query(request.GET)
+    except ValueError as error:
+        return json_response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    version = get_catalog_version()
+    tag, last_modified = get_catalog_validators(version, page_query)
+
+    def get_variants():
+        if page_query is None:
+            return get_product_catalog(version)
+        return get_catalog_page(version, page_query)
+
+    return make_precompressed_response(request, tag, last_modified, get_variants)
+
+
+async def async_product_list_api(request):
+    try:
+        page_query = parse_page_query(request.GET)
+    except ValueError as error:
+        return json_response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    version = await aget_catalog_version()
+    tag, last_modified = get_catalog_validators(version, page_query)
+
+    encoding, etag, response = get_precompressed_response(request, tag, last_modified)
+    if response is None:
+        if page_query is None:
+            variants = await aget_product_catalog(version)
+        else:
+            variants = await aget_catalog_page(version, page_query)
+        response = HttpResponse(variants[encoding], content_type='application/json')
+    return finalize_precompressed_response(response, encoding, etag, last_modified)
+
+
+def find_products(params):
+    limit = SEARCH_LIMIT
+    if params.get('limit'):
+        limit = min(parse_int(params['limit'], 'limit'), SEARCH_LIMIT)
+    product_ids = search_products(params.get('q', ''), limit=limit, available_only=True)
+    products = Product.objects.select_related('category').in_bulk(product_ids)
+    return [dump_product(products[product_id]) for product_id in product_ids if product_id in products]
+
+
+def product_search_api(request):
+    try:
+        return json_response(find_products(request.GET))
+    except ValueError as error:
+        return json_response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+async def async_product_search_api(request):
+    try:
+        return json_response(await sync_to_async(find_products)(request.GET))
+    except ValueError as error:
+        return json_response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def restaurant_menu_api(request, restaurant_id):
+    version = get_menu_version(restaurant_id)
+    variants = version and get_restaurant_menu(restaurant_id, version)
+    if variants is None:
+        return json_response({'error': 'Ресторан не найден.'}, status=status.HTTP_404_NOT_FOUND)
+    tag, last_modified = get_menu_validators(restaurant_id, version)
+    return make_precompressed_response(request, tag, last_modified, lambda: variants)
+
+
+async def async_restaurant_menu_api(request, restaurant_id):
+    version = await aget_menu_version(restaurant_id)
+    variants = version and await aget_restaurant_menu(restaurant_id, version)
+    if variants is None:
+        return json_response({'error': 'Ресторан не найден.'}, status=status.HTTP_404_NOT_FOUND)
+    tag, last_modified = get_menu_validators(restaurant_id, version)
+    return make_precompressed_response(request, tag, last_modified, lambda: variants)
+
+
+def dump_order(order):
+    return {
+        'id': order.id,
+        'firstname': order.firstname,
+        'lastname': order.lastname,
+        'address': order.address,
+        'phonenumber': str(order.phonenumber)
+    }
+
+
+def get_request_hash(data):
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode()
+    ).hexdigest()
+
+
+def replay_idempotent_response(stored, request_hash):
+    # ответ повторяем только на тот же самый заказ: иначе по чужому ключу
+    # можно было бы прочитать имя, адрес и телефон другого покупателя
+    if not hmac.compare_digest(stored.request_hash, request_hash):
+        return (
+            {'error': 'Ключ Idempotency-Key уже использован для другого заказа.'},
+            status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return stored.response_data, stored.response_status
+
+
+def get_idempotent_response(key, request_hash):
+    stored = IdempotencyKey.objects.active().filter(key=key).first()
+    if stored:
+        return replay_idempotent_response(stored, request_hash)
+
+
+def accept_order(data, idempotency_key=None):
+    # проверка заказа читает базу вне транзакции: SQLite не может поднять блокировку
+    # чтения до записи, пока пишет другой запрос, и сразу отвечает «database is locked»
+    if idempotency_key:
+        if len(idempotency_key) > IdempotencyKey._meta.get_field('key').max_length:
+            return (
+                {'error': 'Слишком длинный заголовок Idempotency-Key.'},
+                status.HTTP_400_BAD_REQUEST
+            )
+        request_hash = get_request_hash(data)
+        response = get_idempotent_response(idempotency_key, request_hash)
+        if response:
+            return response
+        IdempotencyKey.objects.expired().filter(key=idempotency_key).delete()
+
+    serializer = OrderSerializer(data=data)
+    if not serializer.is_valid():
+        return serializer.errors, status.HTTP_400_BAD_REQUEST
+
+    try:
+        with transaction.atomic():
+            order = serializer.save()
+            dumped_order = dump_order(order)
+            if idempotency_key:
+                IdempotencyKey.objects.create(
+                    key=idempotency_key,
+                    request_hash=request_hash,
+                    response_status=status.HTTP_201_CREATED,
+                    response_data=dumped_order,
+                    expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                )
+    except IntegrityError:
+        # параллельный повтор того же запроса успел сохранить заказ первым
+        response = idempotency_key and get_idempotent_response(idempotency_key, request_hash)
+        if not response:
+            raise
+        return response
+
+    return dumped_order, status.HTTP_201_CREATED
 
 
 @api_view(['POST'])
-@transaction.atomic
 def register_order(request):
-    serializer = OrderSerializer(data=request.data)
-
-    if serializer.is_valid():
-        order = Order.objects.create(
-            firstname=serializer.validated_data['firstname'],
-            lastname=serializer.validated_data['lastname'],
-            phonenumber=serializer.validated_data['phonenumber'],
-            address=serializer.validated_data['address'],
+    idempotency_key = request.headers.get('Idempotency-Key')
+    # повтор уже принятого заказа получает сохранённый ответ и не расходует лимит,
+    # иначе клиент с плохой связью упрётся в лимит на свой же заказ
+    response = idempotency_key and get_idempotent_response(idempotency_key, get_request_hash(request.data))
+    if response:
+        data, response_status = response
+        return Response(data, status=response_status)
+
+    throttle = OrderRateThrottle()
+    if not throttle.allow_request(request, None):
+        raise Throttled(throttle.wait())
+
+    data, response_status = accept_order(request.data, idempotency_key)
+    return Response(data, status=response_status)
+
+
+@csrf_exempt
+@require_POST
+async def async_register_order(request):
+    try:
+        payload = fastjson.loads(request.body)
+    except ValueError:
+        return json_response(
+            {'error': 'Тело запроса должно быть в формате JSON.'},
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-        for item in serializer.validated_data['products']:
-            try:
-                product_id = item['product']
-                quantity = item['quantity']
-            except Product.DoesNotExist:
-                return Response(
-                    {"error": f"Product with id {product_id} does not exist"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            OrderItem.objects.create(
-                order=order,
-                product=product_id,
-                quantity=quantity
-            )
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        stored = await IdempotencyKey.objects.active().filter(key=idempotency_key).afirst()
+        if stored:
+            data, response_status = replay_idempotent_response(stored, get_request_hash(payload))
+            return json_response(data, status=response_status)
+
+    wait_time = await sync_to_async(get_order_wait_time)(
+        OrderRateThrottle().get_ident(request),
+        payload.get('phonenumber') if isinstance(payload, dict) else None,
+    )
+    if wait_time:
+        response = json_response(
+            {'detail': 'Слишком много запросов.'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        response['Retry-After'] = get_retry_after(wait_time)
+        return response
+
+    # транзакции Django работают только в синхронном коде
+    data, response_status = await sync_to_async(accept_order)(payload, idempotency_key)
+    return json_response(data, status=response_status)
+
+
+@api_view(['POST'])
+@permission_classes([IsPartner])
+@throttle_classes([PartnerRateThrottle])
+def register_orders_batch(request):
+    raw_orders = request.data
+    if not isinstance(raw_orders, list):
+        return Response(
+            {'error': 'Ожидается список заказов.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(raw_orders) > settings.ORDER_BATCH_MAX_SIZE:
+        return Response(
+            {'error': f'Не больше {settings.ORDER_BATCH_MAX_SIZE} заказов за один запрос.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    context = {
+        'products': load_products(collect_product_ids(raw_orders)),
+    }
+    results = [None] * len(raw_orders)
+    valid_positions = []
+    valid_orders = []
+    for position, raw_order in enumerate(raw_orders):
+        serializer = OrderSerializer(data=raw_order, context=context)
+        if serializer.is_valid():
+            valid_positions.append(position)
+            valid_orders.append(serializer.validated_data)
+        else:
+            results[position] = {'status': 'error', 'errors': serializer.errors}
+
+    if valid_orders:
+        with transaction.atomic():
+            orders = create_orders(valid_orders)
+        for position, order in zip(valid_positions, orders):
+            results[position] = {'status': 'created', 'order': dump_order(order)}
 
-        data = {
-            'id': order.id,
-            'firstname': order.firstname,
-            'lastname': order.lastname,
-            'address': order.address,
-            'phonenumber': str(order.phonenumber)
-        }
-        return Response(data, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return Response(results, status=status.HTTP_200_OK)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from foodcartapp.catalog import aget_version
+from foodcartapp.models import Order
+from foodcartapp.order_feed import VERSION_KEY
+
+from .orders import attach_ready_restaurants, filter_orders, get_statuses
+
+
+# как часто открытая лента проверяет версию заказов в кэше
+POLL_INTERVAL = 1
+# комментарий раз в 15 секунд не даёт прокси закрыть молчащее соединение
+KEEPALIVE_INTERVAL = 15
+# через 5 минут соединение закрывается, и браузер сам переподключается с последним курсором
+STREAM_TIMEOUT = 5 * 60
+# без ASGI лента отвечает сразу, а браузер переподключается через столько миллисекунд
+RETRY_DELAY_MS = 5000
+# заказ, сохранённый до чтения ленты, но закоммиченный после, всё равно попадёт в ленту
+CURSOR_OVERLAP = timedelta(seconds=10)
+
+
+def parse_since(request):
+    # EventSource при переподключении присылает id последнего события в Last-Event-ID
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    try:
+        since = since and parse_datetime(since)
+    except ValueError:
+        # дата по формату верная, но такого дня нет, например 2026-13-45
+        since = None
+    if not since:
+        return timezone.now()
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def get_order_deltas(filters, since, next_path):
+    # возвращает [(id заказа, дата изменения, строка таблицы или None, если строку убрать)]
+    now = timezone.now()
+    changed = dict(
+        Order.objects
+        .filter(changed_at__gt=since - CURSOR_OVERLAP)
+        .values_list('pk', 'changed_at')
+    )
+    if not changed:
+        return [], now
+
+    visible_orders = attach_ready_restaurants(list(
+        filter_orders(Order.objects.select_related('restaurant'), filters)
+        .filter(pk__in=changed, status__in=get_statuses(filters))
+    ))
+    deltas = [
+        (
+            order.pk,
+            changed[order.pk],
+            render_to_string('order_row.html', {'item': order, 'next_path': next_path}),
+        )
+        for order in visible_orders
+    ]
+    visible_ids = {order.pk for order in visible_orders}
+    # заказ закрыли или он больше не подходит под фильтры — строку убираем
+    deltas += [(pk, changed_at, None) for pk, changed_at in changed.items() if pk not in visible_ids]
+    return deltas, now
+
+
+def format_events(deltas, cursor):
+    events = [
+        f'event: order\ndata: {json.dumps({"id": pk, "html": html})}\n\n'
+        for pk, _, html in deltas
+    ]
+    # id отдельным событием: браузер запомнит курсор, только когда получит всю пачку
+    events.append(f'id: {cursor.isoformat()}\n\n')
+    return ''.join(events)
+
+
+def get_feed_once(filters, since, next_path):
+    deltas, cursor = get_order_deltas(filters, since, next_path)
+    return f'retry: {RETRY_DELAY_MS}\n\n' + format_events(deltas, cursor)
+
+
+async def stream_feed(filters, since, next_path):
+    # пока заказы не меняются, открытая лента только читает версию из кэша
+    # раз в секунду и не ходит в базу
+    yield f'retry: {RETRY_DELAY_MS}\n\n'
+    started_at = last_sent_at = time.monotonic()
+    version = None
+    # заказы из окна перекрытия уже отправлены, повторно шлём только новые изменения
+    sent = {}
+    while time.monotonic() - started_at < STREAM_TIMEOUT:
+        current_version = await aget_version(VERSION_KEY)
+        if current_version != version:
+            version = current_version
+            deltas, since = await sync_to_async(get_order_deltas)(filters, since, next_path)
+            deltas = [delta for delta in deltas if sent.get(delta[0]) != delta[1]]
+            sent = {
+                pk: changed_at
+                for pk, changed_at in {**sent, **{pk: changed_at for pk, changed_at, _ in deltas}}.items()
+                if changed_at > since - CURSOR_OVERLAP
+            }
+            if deltas:
+                yield format_events(deltas, since)
+                last_sent_at = time.monotonic()
+        if time.monotonic() - last_sent_at > KEEPALIVE_INTERVAL:
+            yield ': ping\n\n'
+            last_sent_at = time.monotonic()
+        await asyncio.sleep(POLL_INTERVAL)
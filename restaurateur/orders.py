@@ -0,0 +1,208 @@
+import heapq
+import math
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django import forms
+from django.db.models import Exists, OuterRef, Prefetch, Q, prefetch_related_objects
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from foodcartapp.models import MAX_ID, Order, OrderCandidate, Restaurant
+
+
+ORDERS_PAGE_SIZE = 50
+
+# поле, по которому листается страница, и направление сортировки
+SORTINGS = {
+    'registration_date': ('registration_date', 'asc'),
+    'total': ('total_price', 'desc'),
+    'distance': ('nearest_distance_km', 'asc'),
+}
+
+
+class OrderFilterForm(forms.Form):
+    status = forms.ChoiceField(
+        label='Статус',
+        required=False,
+        choices=[('', 'Все открытые'), ('pending', 'Необработанные'), ('processing', 'Готовятся')],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    payment_type = forms.ChoiceField(
+        label='Оплата',
+        required=False,
+        choices=[('', 'Любая оплата')] + Order.PAYMENT_TYPE,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан',
+        required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        empty_label='Любой ресторан',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    older_than = forms.IntegerField(
+        label='Ждёт дольше, мин',
+        required=False,
+        min_value=0,
+        # больше десяти лет дата отсечки не нужна, а слишком большое число не влезет в datetime
+        max_value=10 * 365 * 24 * 60,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Ждёт дольше, мин'})
+    )
+    sort = forms.ChoiceField(
+        label='Сортировка',
+        required=False,
+        choices=[
+            ('registration_date', 'Сначала старые'),
+            ('total', 'Сначала дорогие'),
+            ('distance', 'Сначала ближние'),
+        ],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    cursor = forms.CharField(
+        required=False,
+        widget=forms.HiddenInput
+    )
+
+    def clean_sort(self):
+        return self.cleaned_data['sort'] or 'registration_date'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('cursor') and 'sort' in cleaned_data:
+            try:
+                cleaned_data['cursor'] = parse_cursor(cleaned_data['cursor'], cleaned_data['sort'])
+            except ValueError:
+                self.add_error('cursor', 'Ссылка на страницу устарела, откройте список заново.')
+        else:
+            cleaned_data['cursor'] = None
+        return cleaned_data
+
+
+def parse_cursor(cursor, sort):
+    value, pk = cursor.rsplit(',', 1)
+    field, _ = SORTINGS[sort]
+    if field == 'registration_date':
+        value = parse_datetime(value)
+        if value is None:
+            raise ValueError(f'Неверная дата в курсоре: {cursor}')
+    elif field == 'total_price':
+        try:
+            value = Decimal(value)
+        except InvalidOperation:
+            raise ValueError(f'Неверная сумма в курсоре: {cursor}')
+        if not value.is_finite():
+            raise ValueError(f'Неверная сумма в курсоре: {cursor}')
+    else:
+        value = float(value) if value else None
+        if value is not None and not math.isfinite(value):
+            raise ValueError(f'Неверное расстояние в курсоре: {cursor}')
+    pk = int(pk)
+    if not 0 < pk <= MAX_ID:
+        raise ValueError(f'Неверный id в курсоре: {cursor}')
+    return value, pk
+
+
+def encode_cursor(order, sort):
+    field, _ = SORTINGS[sort]
+    value = getattr(order, field)
+    if value is None:
+        value = ''
+    elif field == 'registration_date':
+        value = value.isoformat()
+    return f'{value},{order.pk}'
+
+
+def get_sort_key(sort):
+    field, direction = SORTINGS[sort]
+    if direction == 'desc':
+        return lambda order: (-getattr(order, field), -order.pk)
+    # заказы без расстояния идут в конце списка
+    return lambda order: (getattr(order, field) is None, getattr(order, field) or 0, order.pk)
+
+
+def scan_orders(orders, sort, cursor, limit):
+    # keyset-пагинация: следующая страница начинается после ключа последнего заказа,
+    # поэтому база идёт по индексу и останавливается на limit, а не пропускает строки через OFFSET
+    field, direction = SORTINGS[sort]
+    value, pk = cursor or (None, None)
+    if direction == 'desc':
+        if cursor:
+            orders = orders.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+        return list(orders.order_by(f'-{field}', '-pk')[:limit])
+
+    found = []
+    if not cursor or value is not None:
+        ordered = orders.filter(**{f'{field}__isnull': False})
+        if cursor:
+            ordered = ordered.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+        found = list(ordered.order_by(field, 'pk')[:limit])
+    if len(found) < limit and Order._meta.get_field(field).null:
+        # NULLS LAST не даёт базе идти по индексу, поэтому заказы без значения читаются отдельно
+        unordered = orders.filter(**{f'{field}__isnull': True})
+        if cursor and value is None:
+            unordered = unordered.filter(pk__gt=pk)
+        found += unordered.order_by('pk')[:limit - len(found)]
+    return found
+
+
+def get_statuses(filters):
+    return [filters['status']] if filters['status'] else Order.OPEN_STATUSES
+
+
+def filter_orders(orders, filters):
+    # все фильтры, кроме статуса: статусы страница читает по отдельности
+    if filters['payment_type']:
+        orders = orders.filter(payment_type=filters['payment_type'])
+    if filters['restaurant']:
+        # ресторан, который готовит заказ, или ресторан, в котором его можно приготовить
+        candidates = OrderCandidate.objects.filter(order=OuterRef('pk'), restaurant=filters['restaurant'])
+        orders = orders.filter(Q(restaurant=filters['restaurant']) | Exists(candidates))
+    if filters['older_than'] is not None:
+        orders = orders.filter(registration_date__lte=timezone.now() - timedelta(minutes=filters['older_than']))
+    return orders
+
+
+def attach_ready_restaurants(orders):
+    ready_candidates = (
+        OrderCandidate.objects
+        .filter(distance_km__isnull=False)
+        .select_related('restaurant')
+        .order_by('distance_km')
+    )
+    prefetch_related_objects(
+        orders,
+        Prefetch('candidates', queryset=ready_candidates, to_attr='ready_candidates'),
+    )
+    for order in orders:
+        order.ready_restaurants = [
+            {
+                'name': candidate.restaurant,
+                'distance': round(candidate.distance_km, 2)
+            }
+            for candidate in order.ready_candidates
+        ]
+    return orders
+
+
+def get_orders_page(filters):
+    orders = filter_orders(Order.objects.select_related('restaurant'), filters)
+
+    # индекс начинается со статуса, поэтому каждый статус читается по индексу отдельно,
+    # а готовые отсортированные куски сливаются; на одну запись больше — чтобы узнать,
+    # есть ли следующая страница
+    sort = filters['sort']
+    found = heapq.merge(
+        *[
+            scan_orders(orders.filter(status=status), sort, filters['cursor'], ORDERS_PAGE_SIZE + 1)
+            for status in get_statuses(filters)
+        ],
+        key=get_sort_key(sort),
+    )
+    page = list(islice(found, ORDERS_PAGE_SIZE + 1))
+
+    next_cursor = None
+    if len(page) > ORDERS_PAGE_SIZE:
+        next_cursor = encode_cursor(page[ORDERS_PAGE_SIZE - 1], sort)
+    return attach_ready_restaurants(page[:ORDERS_PAGE_SIZE]), next_cursor
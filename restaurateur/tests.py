@@ -1,3 +1,240 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from django.utils import timezone
+
+from foodcartapp.models import Order
+from star_burger.testing import CacheResetTestCase
+
+from . import views
+from .feed import get_order_deltas, parse_since
+from .orders import OrderFilterForm, get_orders_page
+
+
+def create_order(**fields):
+    return Order.objects.create(**{
+        'firstname': 'Иван',
+        'lastname': 'Петров',
+        'phonenumber': '+79291234567',
+        'address': 'Москва, Тверская, 1',
+        'payment_type': 'cash',
+        **fields,
+    })
+
+
+def get_filters(**params):
+    form = OrderFilterForm(params)
+    if not form.is_valid():
+        raise AssertionError(form.errors)
+    return form.cleaned_data
+
+
+@mock.patch('restaurateur.orders.ORDERS_PAGE_SIZE', 3)
+class OrdersPageTest(CacheResetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # одинаковые суммы и расстояния проверяют, что страницы не теряют и не повторяют заказы
+        cls.orders = [
+            create_order(
+                status=status,
+                registration_date=now - timedelta(minutes=index),
+                total_price=Decimal(100 * (index % 3)),
+                nearest_distance_km=None if index % 4 == 0 else float(index % 5),
+            )
+            for index, status in enumerate(['pending', 'processing'] * 5)
+        ]
+        create_order(status='completed', total_price=Decimal(1000))
+
+    def read_all_pages(self, **params):
+        order_ids = []
+        cursor = None
+        while True:
+            page, cursor = get_orders_page(get_filters(**params, **({'cursor': cursor} if cursor else {})))
+            order_ids += [order.pk for order in page]
+            if cursor is None:
+                return order_ids
+
+    def test_pages_follow_registration_date(self):
+        expected = [order.pk for order in sorted(self.orders, key=lambda order: (order.registration_date, order.pk))]
+
+        self.assertEqual(self.read_all_pages(), expected)
+
+    def test_pages_follow_total_price(self):
+        expected = [order.pk for order in sorted(self.orders, key=lambda order: (-order.total_price, -order.pk))]
+
+        self.assertEqual(self.read_all_pages(sort='total'), expected)
+
+    def test_pages_follow_distance_with_unknown_distances_last(self):
+        expected = [
+            order.pk
+            for order in sorted(
+                self.orders,
+                key=lambda order: (order.nearest_distance_km is None, order.nearest_distance_km or 0, order.pk),
+            )
+        ]
+
+        self.assertEqual(self.read_all_pages(sort='distance'), expected)
+        self.assertIsNone(Order.objects.get(pk=expected[-1]).nearest_distance_km)
+
+    def test_pages_follow_status_filter(self):
+        expected = [order.pk for order in self.orders if order.status == 'processing']
+
+        self.assertEqual(sorted(self.read_all_pages(status='processing', sort='distance')), sorted(expected))
+
+    def test_bad_cursors_are_rejected(self):
+        bad_cursors = [
+            ('registration_date', 'garbage'),
+            ('registration_date', '2026-13-45T00:00:00,1'),
+            ('registration_date', f'{timezone.now().isoformat()},{10 ** 30}'),
+            ('total', 'NaN,1'),
+            ('total', 'Infinity,1'),
+            ('total', 'abc,1'),
+            ('distance', 'inf,1'),
+            ('distance', 'nan,1'),
+        ]
+        for sort, cursor in bad_cursors:
+            with self.subTest(sort=sort, cursor=cursor):
+                form = OrderFilterForm({'sort': sort, 'cursor': cursor})
+                self.assertFalse(form.is_valid())
+                self.assertIn('cursor', form.errors)
+
+    def test_too_large_older_than_is_rejected(self):
+        form = OrderFilterForm({'older_than': '99999999999'})
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('older_than', form.errors)
+
+
+class OrderFeedTest(CacheResetTestCase):
+    def get_deltas(self, since, **params):
+        deltas, _ = get_order_deltas(get_filters(**params), since, '/manager/orders/')
+        return {pk: html for pk, _, html in deltas}
+
+    def test_changed_orders_are_sent_as_rows(self):
+        since = timezone.now()
+        order = create_order(total_price=Decimal(250))
+
+        deltas = self.get_deltas(since)
+
+        self.assertIn(f'data-order-id="{order.pk}"', deltas[order.pk])
+        self.assertIn('250', deltas[order.pk])
+
+    def test_unchanged_orders_are_not_sent(self):
+        create_order(total_price=Decimal(250))
+
+        self.assertEqual(self.get_deltas(timezone.now() + timedelta(minutes=1)), {})
+
+    def test_closed_orders_are_removed(self):
+        order = create_order()
+        since = timezone.now()
+        order.status = 'completed'
+        order.save()
+
+        self.assertEqual(self.get_deltas(since), {order.pk: None})
+
+    def test_orders_leaving_the_filter_are_removed(self):
+        order = create_order(payment_type='cash')
+        since = timezone.now()
+        order.comment = 'Позвонить за час'
+        order.save()
+
+        self.assertEqual(self.get_deltas(since, payment_type='electronic'), {order.pk: None})
+
+    def test_bad_since_falls_back_to_now(self):
+        factory = RequestFactory()
+        for since in ['garbage', '2026-13-45T00:00:00']:
+            with self.subTest(since=since):
+                before = timezone.now()
+                self.assertGreaterEqual(parse_since(factory.get('/', {'since': since})), before)
+        request = factory.get('/', headers={'Last-Event-ID': '2026-02-30T10:00:00'})
+        self.assertGreaterEqual(parse_since(request), before)
+
+    def test_naive_since_is_made_aware(self):
+        since = parse_since(RequestFactory().get('/', {'since': '2026-01-01T10:00:00'}))
+
+        self.assertTrue(timezone.is_aware(since))
+
+
+class OrdersViewTest(CacheResetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='secret', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.manager)
+
+    def test_orders_page_lists_open_orders(self):
+        order = create_order(total_price=Decimal(350))
+        closed_order = create_order(status='completed')
+
+        response = self.client.get('/manager/orders/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'data-order-id="{order.pk}"')
+        self.assertNotContains(response, f'data-order-id="{closed_order.pk}"')
+        self.assertContains(response, 'const insertNewOrders = true;')
+        self.assertTrue(response.context['feed_url'].startswith('/manager/orders/feed/?since='))
+
+    @mock.patch('restaurateur.orders.ORDERS_PAGE_SIZE', 1)
+    def test_orders_page_links_next_page(self):
+        first_order, second_order = create_order(), create_order()
+
+        response = self.client.get('/manager/orders/')
+        self.assertContains(response, f'data-order-id="{first_order.pk}"')
+        self.assertContains(response, 'const insertNewOrders = false;')
+        next_url = response.context['next_url']
+
+        response = self.client.get(f'/manager/orders/{next_url}')
+        self.assertContains(response, f'data-order-id="{second_order.pk}"')
+        self.assertIsNotNone(response.context['first_url'])
+
+    def test_bad_filters_show_errors(self):
+        response = self.client.get('/manager/orders/', {'sort': 'total', 'cursor': 'NaN,1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Ссылка на страницу устарела')
+        self.assertIsNone(response.context['feed_url'])
+
+    def test_orders_page_requires_manager(self):
+        self.client.logout()
+
+        response = self.client.get('/manager/orders/')
+
+        self.assertEqual(response.status_code, 302)
+
+    def get_feed(self, params, **headers):
+        request = RequestFactory().get('/manager/orders/feed/', params, headers=headers)
+        request.user = self.manager
+        return views.order_feed(request)
+
+    def test_feed_sends_changed_and_removed_orders(self):
+        since = timezone.now()
+        order = create_order()
+        closed_order = create_order(status='completed')
+
+        response = self.get_feed({'since': since.isoformat()})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        content = response.content.decode()
+        self.assertIn(f'"id": {order.pk}, "html": "<tr data-order-id', content)
+        self.assertIn(f'"id": {closed_order.pk}, "html": null', content)
+        self.assertIn('\nid: ', content)
+
+    def test_feed_continues_from_last_event_id(self):
+        create_order()
+
+        response = self.get_feed({}, **{'Last-Event-ID': (timezone.now() + timedelta(minutes=1)).isoformat()})
+
+        self.assertNotIn('event: order', response.content.decode())
+
+    def test_feed_rejects_bad_filters(self):
+        response = self.get_feed({'older_than': '-1'})
+
+        self.assertEqual(response.status_code, 400)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from django.shortcuts import redirect
 
@@ -14,6 +15,11 @@ urlpatterns = [
 
     # TODO заглушка для нереализованного функционала
     path('orders/', views.view_orders, name="view_orders"),
+    path(
+        'orders/feed/',
+        views.async_order_feed if settings.ASYNC_API else views.order_feed,
+        name="order_feed",
+    ),
 
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
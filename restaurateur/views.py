@@ -1,19 +1,18 @@
+from asgiref.sync import sync_to_async
 from django import forms
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.utils import timezone
 from django.views import View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
-from django.db import transaction
 
-from foodcartapp.models import Product, Restaurant, Order
-from address.models import Place
-from star_burger.settings import YANDEX_API_KEY
-from address.views import fetch_coordinates
-from django.db.models import Count
+from foodcartapp.models import Product, Restaurant
 
-from geopy import distance
+from .feed import get_feed_once, parse_since, stream_feed
+from .orders import OrderFilterForm, get_orders_page
 
 
 class Login(forms.Form):
@@ -95,79 +94,75 @@ def view_restaurants(request):
     })
 
 
-def get_or_create_coordinates(addresses, apikey):
-    unique_addresses = set(addr.strip() for addr in addresses if addr and addr.strip())
-    if not unique_addresses:
-        return {}
-
-    existing_places = Place.objects.filter(address__in=unique_addresses)
-    coords = {place.address: place.coordinates for place in existing_places}
-
-    missing_addresses = unique_addresses - set(coords.keys())
-
-    new_places = []
-    for addr in missing_addresses:
-        yandex_coords = fetch_coordinates(apikey, addr)
-        if yandex_coords:
-            lat, lon = yandex_coords
-            new_places.append(Place(address=addr, lat=lat, lon=lon))
-            coords[addr] = (lat, lon)
-        else:
-            coords[addr] = None
-
-    if new_places:
-        with transaction.atomic():
-            Place.objects.bulk_create(new_places, ignore_conflicts=True)
-
-    return coords
-
-
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
-    orders = (
-        Order.objects
-        .get_total_price()
-        .filter(status__in=["pending", "processing"])
-        .annotate_available_restaurants()
-    )
-
-    if not orders:
-        return render(request, 'order_items.html', {'order_items': []})
-
-    addresses = set()
-    restaurant_ids = set()
-
-    for order in orders:
-        addresses.add(order.address)
-        restaurant_ids.update(order.available_restaurant_ids)
+    form = OrderFilterForm(request.GET)
+    # лента изменений продолжает с момента, когда страница прочитала заказы
+    rendered_at = timezone.now()
+    orders, next_url, first_url, feed_url = [], None, None, None
+    insert_new_orders = False
+    if form.is_valid():
+        orders, next_cursor = get_orders_page(form.cleaned_data)
+        # новые заказы при сортировке по дате попадают в конец списка, то есть на последнюю
+        # страницу; на остальных страницах и сортировках лента только сообщает о них
+        insert_new_orders = form.cleaned_data['sort'] == 'registration_date' and not next_cursor
+        params = request.GET.copy()
+        feed_params = params.copy()
+        feed_params['since'] = rendered_at.isoformat()
+        feed_url = f"{reverse('restaurateur:order_feed')}?{feed_params.urlencode()}"
+        params.pop('cursor', None)
+        if form.cleaned_data['cursor']:
+            first_url = f'?{params.urlencode()}'
+        if next_cursor:
+            params['cursor'] = next_cursor
+            next_url = f'?{params.urlencode()}'
+
+    return render(request, 'order_items.html', {
+        'order_items': orders,
+        'form': form,
+        'next_url': next_url,
+        'first_url': first_url,
+        'feed_url': feed_url,
+        'insert_new_orders': insert_new_orders,
+        'next_path': request.get_full_path(),
+    })
 
-    restaurants_by_id = {}
-    if restaurant_ids:
-        restaurants = Restaurant.objects.filter(id__in=restaurant_ids)
-        for restaurant in restaurants:
-            restaurants_by_id[restaurant.id] = restaurant
-            addresses.add(restaurant.address)
 
-    coords_map = get_or_create_coordinates(addresses, YANDEX_API_KEY)
+def get_feed_query(request):
+    form = OrderFilterForm(request.GET)
+    if not form.is_valid():
+        return None, None
+    params = request.GET.copy()
+    params.pop('since', None)
+    # ссылки «Редактировать» в присланных строках возвращают на ту же страницу заказов
+    next_path = f"{reverse('restaurateur:view_orders')}?{params.urlencode()}"
+    return form.cleaned_data, next_path
 
-    for order in orders:
-        ready_restaurants = []
-        order_coords = coords_map.get(order.address)
 
-        for rest_id in order.available_restaurant_ids:
-            restaurant = restaurants_by_id.get(rest_id)
-            if not restaurant:
-                continue
+def make_feed_response(response):
+    response.headers['Cache-Control'] = 'no-cache'
+    # nginx не должен копить события в буфере
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
-            rest_coords = coords_map.get(restaurant.address)
 
-            if order_coords and rest_coords:
-                dist_km = distance.distance(order_coords, rest_coords).km
-                ready_restaurants.append({
-                    'name': restaurant,
-                    'distance': round(dist_km, 2)
-                })
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def order_feed(request):
+    # без ASGI соединение не держим: отвечаем накопившимися изменениями,
+    # а браузер переподключится сам через несколько секунд
+    filters, next_path = get_feed_query(request)
+    if filters is None:
+        return HttpResponseBadRequest('Неверные фильтры заказов.')
+    content = get_feed_once(filters, parse_since(request), next_path)
+    return make_feed_response(HttpResponse(content, content_type='text/event-stream'))
 
-        order.ready_restaurants = sorted(ready_restaurants, key=lambda x: x['distance'])
 
-    return render(request, 'order_items.html', {'order_items': orders})
+@user_passes_test(is_manager, login_url='restaurateur:login')
+async def async_order_feed(request):
+    filters, next_path = await sync_to_async(get_feed_query)(request)
+    if filters is None:
+        return HttpResponseBadRequest('Неверные фильтры заказов.')
+    return make_feed_response(StreamingHttpResponse(
+        stream_feed(filters, parse_since(request), next_path),
+        content_type='text/event-stream',
+    ))
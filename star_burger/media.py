@@ -0,0 +1,124 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    # поддерживаем один диапазон; на несколько диапазонов по RFC 9110 можно ответить всем файлом
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start and end and int(end) < int(start):
+        # по RFC 9110 такой диапазон неверен и просто игнорируется; 416 — только для начала за концом файла
+        return None
+    if not start:
+        # bytes=-500 — последние 500 байт
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end:
+        raise ValueError(f'Диапазон {header} вне файла размером {size} байт')
+    return start, end
+
+
+def is_range_fresh(request, etag, last_modified):
+    # If-Range: диапазон отдаём, только если у клиента та же версия файла
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def iter_file_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def make_offload_response(path, relative_path, content_type):
+    # тело отдаст веб-сервер: он сам умеет диапазоны и sendfile, а воркер Python сразу свободен
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_OFFLOAD == 'x-accel-redirect':
+        response.headers['X-Accel-Redirect'] = quote(settings.MEDIA_OFFLOAD_PREFIX + relative_path)
+    else:
+        response.headers['X-Sendfile'] = path
+    return response
+
+
+def make_file_response(request, path, size, content_type, etag, last_modified):
+    range_header = request.headers.get('Range')
+    byte_range = None
+    if range_header and is_range_fresh(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        # FileResponse отдаёт файл через wsgi.file_wrapper, то есть sendfile, если сервер его умеет
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            iter_file_range(path, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response.headers['Content-Length'] = str(end - start + 1)
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if settings.MEDIA_OFFLOAD:
+            response = make_offload_response(full_path, path, content_type)
+        else:
+            response = make_file_response(request, full_path, size, content_type, etag, last_modified)
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
@@ -2,7 +2,7 @@ import os
 import dj_database_url
 
 from dotenv import load_dotenv
-from environs import Env
+from environs import Env, validate
 
 load_dotenv()
 
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -48,6 +49,21 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'star_burger.urls'
 
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'foodcartapp.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'foodcartapp.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # сколько прокси стоит перед Django; при 0 X-Forwarded-For не читается, и лимиты
+    # считаются по REMOTE_ADDR, иначе клиент подменил бы свой адрес заголовком
+    'NUM_PROXIES': env.int('NUM_PROXIES', 0),
+}
+
 DEBUG_TOOLBAR_PANELS = [
     'debug_toolbar.panels.versions.VersionsPanel',
     'debug_toolbar.panels.timer.TimerPanel',
@@ -67,7 +83,23 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
         'LOCATION': 'coords_cache',
-    }
+    },
+    'ratelimit': env.dj_cache_url('RATELIMIT_CACHE_URL', 'locmem://ratelimit'),
+    # версии каталога, меню, индексов и заказов читают все процессы, включая run_worker,
+    # поэтому по умолчанию кэш лежит в файлах, а не в памяти одного процесса
+    'catalog': env.dj_cache_url(
+        'CATALOG_CACHE_URL',
+        f"file://{os.path.join(BASE_DIR, '.cache', 'catalog')}?max_entries=10000",
+    ),
+}
+
+CATALOG_CACHE = 'catalog'
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', 24 * 60 * 60)
+
+RATELIMIT_CACHE = 'ratelimit'
+ORDER_RATE_LIMITS = {
+    'ip': env('ORDER_RATE_LIMIT_IP', '30/min'),
+    'phone': env('ORDER_RATE_LIMIT_PHONE', '5/min'),
 }
 
 
@@ -90,15 +122,30 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'star_burger.wsgi.application'
+ASGI_APPLICATION = 'star_burger.asgi.application'
+TEST_RUNNER = 'star_burger.testing.TestRunner'
+ASYNC_API = env.bool('ASYNC_API', False)
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+MEDIA_CACHE_MAX_AGE = env.int('MEDIA_CACHE_MAX_AGE', 24 * 60 * 60)
+# '' — файлы отдаёт Django, x-accel-redirect — nginx, x-sendfile — Apache или lighttpd
+MEDIA_OFFLOAD = env.str(
+    'MEDIA_OFFLOAD',
+    '',
+    validate=validate.OneOf(['', 'x-accel-redirect', 'x-sendfile']),
+)
+MEDIA_OFFLOAD_PREFIX = env.str('MEDIA_OFFLOAD_PREFIX', '/protected-media/')
 
 DATABASES = {
     'default': dj_database_url.config(
         default='sqlite:////{0}'.format(os.path.join(BASE_DIR, 'db.sqlite3'))
     )
 }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # BEGIN IMMEDIATE сразу берёт блокировку записи, и параллельные заказы ждут друг друга,
+    # а не падают с «database is locked», когда транзакция пытается начать запись
+    DATABASES['default'].setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -137,5 +184,27 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "bundles"),
 ]
 
+# collectstatic добавляет к именам файлов хэш содержимого и кладёт рядом сжатые .gz и .br копии,
+# а WhiteNoise отдаёт их с Cache-Control: immutable без отдельного веб-сервера
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 GEOCODER_KEY = os.environ.get('GEOCODER_KEY')
-YANDEX_API_KEY = os.environ.get('YANDEX_API_KEY')
\ No newline at end of file
+YANDEX_API_KEY = os.environ.get('YANDEX_API_KEY')
+# haversine — быстрая формула для шара, geodesic — точнее на эллипсоиде, но в сотни раз медленнее
+DISTANCE_MODE = env.str(
+    'DISTANCE_MODE',
+    'haversine',
+    validate=validate.OneOf(['haversine', 'geodesic']),
+)
+ORDER_BATCH_MAX_SIZE = env.int('ORDER_BATCH_MAX_SIZE', 500)
+# ключи партнёров для /api/orders/batch/: имя=ключ,имя=ключ
+ORDER_BATCH_API_KEYS = env.dict('ORDER_BATCH_API_KEYS', {})
+ORDER_BATCH_RATE_LIMIT = env('ORDER_BATCH_RATE_LIMIT', '60/min')
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.test import TestCase
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from foodcartapp.benchmarks import ISOLATED_CACHES, clear_local_caches
+
+
+class TestRunner(DiscoverRunner):
+    # тесты не должны видеть и менять файловый кэш каталога рабочего сайта;
+    # статика берётся без манифеста, иначе страницы без collectstatic не отрисуются
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.settings_override = override_settings(
+            CACHES=ISOLATED_CACHES,
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {
+                    'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+                },
+            },
+        )
+        self.settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.settings_override.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+class CacheResetTestCase(TestCase):
+    # база откатывается после каждого теста, поэтому кэши и индексы в памяти сбрасываются вместе с ней
+    def setUp(self):
+        super().setUp()
+        for cache in caches.all():
+            cache.clear()
+        clear_local_caches()
+        # вызовы, отложенные до коммита в setUpTestData, в тестах не выполнятся никогда,
+        # поэтому копить в них id задач нельзя
+        for connection in connections.all():
+            connection.__dict__.pop('pending_id_batches', None)
@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from star_burger.testing import CacheResetTestCase
+
+from .media import parse_range
+
+
+class StartPageTest(CacheResetTestCase):
+    def test_start_page_renders_without_collectstatic(self):
+        response = self.client.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/static/icon.png')
+
+
+class ParseRangeTest(SimpleTestCase):
+    def test_ranges(self):
+        cases = [
+            ('bytes=0-9', (0, 9)),
+            ('bytes=90-', (90, 99)),
+            ('bytes=90-500', (90, 99)),
+            ('bytes=-10', (90, 99)),
+            ('bytes=-500', (0, 99)),
+            ('bytes=5-5', (5, 5)),
+            # неверные и неподдерживаемые диапазоны игнорируются
+            ('bytes=5-2', None),
+            ('bytes=-', None),
+            ('bytes=0-1,5-6', None),
+            ('items=0-9', None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 100), expected)
+
+    def test_ranges_outside_the_file_are_unsatisfiable(self):
+        for header in ['bytes=100-', 'bytes=100-200', 'bytes=-0']:
+            with self.subTest(header=header):
+                with self.assertRaises(ValueError):
+                    parse_range(header, 100)
+
+
+@override_settings(MEDIA_OFFLOAD='')
+class ServeMediaTest(CacheResetTestCase):
+    content = bytes(range(100))
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        os.makedirs(os.path.join(media_root, 'products'))
+        with open(os.path.join(media_root, 'products', 'burger.jpg'), 'wb') as file:
+            file.write(self.content)
+
+    def get(self, path='/media/products/burger.jpg', **headers):
+        return self.client.get(path, headers=headers)
+
+    def test_whole_file(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        response = self.get(Range='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_invalid_range_is_ignored(self):
+        response = self.get(Range='bytes=5-2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_range_outside_the_file(self):
+        response = self.get(Range='bytes=100-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        last_modified = self.get()['Last-Modified']
+
+        for if_range in [etag, last_modified]:
+            with self.subTest(if_range=if_range):
+                response = self.get(Range='bytes=0-9', If_Range=if_range)
+                self.assertEqual(response.status_code, 206)
+
+        # файл изменился: вместо диапазона клиент получает весь файл
+        for if_range in ['"stale"', http_date(0)]:
+            with self.subTest(if_range=if_range):
+                response = self.get(Range='bytes=0-9', If_Range=if_range)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_conditional_request(self):
+        etag = self.get()['ETag']
+
+        self.assertEqual(self.get(If_None_Match=etag).status_code, 304)
+
+    def test_paths_outside_media_root_are_not_served(self):
+        for path in [
+            '/media/../star_burger/settings.py',
+            '/media/%2e%2e/star_burger/settings.py',
+            '/media/products/..%2f..%2fmanage.py',
+            '/media//etc/passwd',
+            '/media/products/',
+            '/media/products/burger.jpg/x',
+        ]:
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path).status_code, 404)
+
+    @override_settings(MEDIA_OFFLOAD='x-accel-redirect')
+    def test_offload_to_nginx(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/products/burger.jpg')
+        self.assertEqual(response.content, b'')